@@ -1,62 +1,59 @@
 # app.py
 import streamlit as st
-import pandas as pd
 
-from lib.io_utils import download_excel
+from lib.pipelines import DEFAULT_CFG, load_qa_cmdb, qa_key, run_qa
+from lib.ui_utils import export_panel, file_input, history_button, profiling_panel, result_viewer
+from lib.profiling import start_run
+from lib.validations import ALERT_LABELS
 
 st.set_page_config(page_title="QA Inventario - Gestión de Activos", layout="wide")
 
 TITLE = 'QA Inventario "Gestión de Activos"'
-REQUIRED_COLS = [
-    "Número de serie",
-    "Hostname",
-    "Tipo",
-    "Correo Electrónico",
-    "Clasificación Distribución",
-]
 
 def ui_sidebar():
+    # valores iniciales de DEFAULT_CFG: los mismos que usa el CLI sin --config
+    f, p, r = DEFAULT_CFG["filters"], DEFAULT_CFG["params"], DEFAULT_CFG["rules"]
     st.sidebar.header("⚙️ Validaciones a ejecutar")
 
     with st.sidebar.expander("Filtros previos (dataset)", expanded=True):
         use_filter_dist = st.checkbox(
-            "Incluir solo 'Distribuido(s)'", value=True,
+            "Incluir solo 'Distribuido(s)'", value=f["dist"],
             help="Filtra 'Clasificación Distribución' por 'distribuidos' o 'distribuido'."
         )
         use_filter_tipo = st.checkbox(
-            "Incluir solo Notebook / Desktop", value=True,
+            "Incluir solo Notebook / Desktop", value=f["tipo"],
             help="Filtra 'Tipo' por 'notebook' o 'desktop'."
         )
 
     with st.sidebar.expander("Parámetros", expanded=True):
-        minlen_serie = st.number_input("Longitud mínima de Serie", min_value=1, value=7, step=1)
-        minlen_host = st.number_input("Longitud mínima de Hostname", min_value=1, value=7, step=1)
+        minlen_serie = st.number_input("Longitud mínima de Serie", min_value=1, value=p["minlen_serie"], step=1)
+        minlen_host = st.number_input("Longitud mínima de Hostname", min_value=1, value=p["minlen_host"], step=1)
         allowed_domains_raw = st.text_input(
             "Dominios de correo permitidos (separados por coma)",
-            value="@pacifico,@prima",
+            value=",".join(p["allowed_domains"]),
             help="Se revisa que el correo contenga alguno de estos valores."
         )
         allowed_domains = [d.strip().lower() for d in allowed_domains_raw.split(",") if d.strip()]
 
     with st.sidebar.expander("Validaciones: Número de serie", expanded=True):
-        v_serie_vacio = st.checkbox("Serie vacía", value=True)
-        v_serie_espacios = st.checkbox("Serie contiene espacios", value=True)
-        v_serie_minlen = st.checkbox("Serie menor a longitud mínima", value=True)
+        v_serie_vacio = st.checkbox("Serie vacía", value=r["serie"]["vacio"])
+        v_serie_espacios = st.checkbox("Serie contiene espacios", value=r["serie"]["espacios"])
+        v_serie_minlen = st.checkbox("Serie menor a longitud mínima", value=r["serie"]["minlen"])
 
     with st.sidebar.expander("Validaciones: Hostname", expanded=True):
-        v_host_vacio = st.checkbox("Hostname vacío", value=True)
-        v_host_espacios = st.checkbox("Hostname contiene espacios", value=True)
-        v_host_minlen = st.checkbox("Hostname menor a longitud mínima", value=True)
+        v_host_vacio = st.checkbox("Hostname vacío", value=r["host"]["vacio"])
+        v_host_espacios = st.checkbox("Hostname contiene espacios", value=r["host"]["espacios"])
+        v_host_minlen = st.checkbox("Hostname menor a longitud mínima", value=r["host"]["minlen"])
 
     with st.sidebar.expander("Validaciones: Correo", expanded=True):
-        v_mail_vacio = st.checkbox("Correo vacío", value=True)
-        v_mail_espacios = st.checkbox("Correo contiene espacios", value=True)
-        v_mail_dominio = st.checkbox("Correo no pertenece a dominios permitidos", value=True)
+        v_mail_vacio = st.checkbox("Correo vacío", value=r["mail"]["vacio"])
+        v_mail_espacios = st.checkbox("Correo contiene espacios", value=r["mail"]["espacios"])
+        v_mail_dominio = st.checkbox("Correo no pertenece a dominios permitidos", value=r["mail"]["dominio"])
 
     with st.sidebar.expander("Validaciones: Duplicados", expanded=True):
-        v_dup_serie = st.checkbox("Serie duplicada", value=True)
-        v_dup_host = st.checkbox("Hostname duplicado", value=True)
-        v_dup_mail = st.checkbox("Correo duplicado", value=True)
+        v_dup_serie = st.checkbox("Serie duplicada", value=r["dups"]["serie"])
+        v_dup_host = st.checkbox("Hostname duplicado", value=r["dups"]["host"])
+        v_dup_mail = st.checkbox("Correo duplicado", value=r["dups"]["mail"])
 
     cfg = {
         "filters": {"dist": use_filter_dist, "tipo": use_filter_tipo},
@@ -74,111 +71,46 @@ def ui_sidebar():
     }
     return cfg
 
-def normalize_df(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df = df[REQUIRED_COLS]
-    df = df.apply(lambda col: col.map(lambda x: str(x).strip() if pd.notnull(x) else ""))
-    return df
-
-def apply_filters(df: pd.DataFrame, cfg) -> pd.DataFrame:
-    f = cfg["filters"]
-    if f["dist"]:
-        df = df[df["Clasificación Distribución"].str.lower().isin(["distribuidos", "distribuido"])]
-    if f["tipo"]:
-        df = df[df["Tipo"].str.lower().isin(["notebook", "desktop"])]
-    return df
-
-def apply_validations(df: pd.DataFrame, cfg) -> pd.DataFrame:
-    r = cfg["rules"]; p = cfg["params"]
-    df = df.copy()
-    df["Alertas"] = ""
-
-    # Serie
-    if r["serie"]["vacio"]:
-        df.loc[df["Número de serie"] == "", "Alertas"] += "Serie vacía. "
-    if r["serie"]["espacios"]:
-        df.loc[df["Número de serie"].str.contains(" "), "Alertas"] += "Serie contiene espacios. "
-    if r["serie"]["minlen"]:
-        df.loc[df["Número de serie"].str.len() < int(p["minlen_serie"]), "Alertas"] += "Serie menor a longitud mínima. "
-
-    # Hostname
-    if r["host"]["vacio"]:
-        df.loc[df["Hostname"] == "", "Alertas"] += "Hostname vacío. "
-    if r["host"]["espacios"]:
-        df.loc[df["Hostname"].str.contains(" "), "Alertas"] += "Hostname contiene espacios. "
-    if r["host"]["minlen"]:
-        df.loc[df["Hostname"].str.len() < int(p["minlen_host"]), "Alertas"] += "Hostname menor a longitud mínima. "
-
-    # Correo
-    if r["mail"]["vacio"]:
-        df.loc[df["Correo Electrónico"] == "", "Alertas"] += "Correo vacío. "
-    if r["mail"]["espacios"]:
-        df.loc[df["Correo Electrónico"].str.contains(" "), "Alertas"] += "Correo contiene espacios. "
-    if r["mail"]["dominio"]:
-        allowed = p["allowed_domains"]
-        if allowed:
-            mask_domain = ~df["Correo Electrónico"].str.lower().apply(
-                lambda x: any(d in x for d in allowed)
-            )
-            df.loc[mask_domain, "Alertas"] += "Correo no pertenece a dominios permitidos. "
-
-    # Duplicados
-    dup_serie = df["Número de serie"].duplicated(keep=False) & (df["Número de serie"] != "")
-    dup_host  = df["Hostname"].duplicated(keep=False) & (df["Hostname"] != "")
-    dup_mail  = df["Correo Electrónico"].duplicated(keep=False) & (df["Correo Electrónico"] != "")
-    if cfg["rules"]["dups"]["serie"]:
-        df.loc[dup_serie, "Alertas"] += "Serie duplicada. "
-    if cfg["rules"]["dups"]["host"]:
-        df.loc[dup_host, "Alertas"] += "Hostname duplicado. "
-    if cfg["rules"]["dups"]["mail"]:
-        df.loc[dup_mail, "Alertas"] += "Correo duplicado. "
-
-    return df
-
 def main():
     st.title(TITLE)
     st.write("Carga tu archivo de inventario en Excel y genera un reporte de **alertas** según reglas seleccionadas.")
 
     cfg = ui_sidebar()
-    uploaded_file = st.file_uploader("Sube tu archivo Excel", type=["xlsx"])
+    uploaded_file = file_input("Sube tu archivo Excel", ["xlsx"], key="qa_cmdb")
     if uploaded_file is None:
         st.info("Esperando archivo .xlsx…")
         return
 
     try:
-        df = pd.read_excel(uploaded_file)
+        df = load_qa_cmdb(uploaded_file)
+    except ValueError as e:
+        st.error(str(e))
+        return
     except Exception as e:
         st.error(f"Error leyendo el Excel: {e}")
         return
 
     st.subheader("Columnas detectadas")
-    st.write(df.columns.tolist())
+    st.write(df.attrs.get("source_columns", df.columns.tolist()))
 
-    missing = [c for c in REQUIRED_COLS if c not in df.columns]
-    if missing:
-        st.error(f"Faltan columnas requeridas: {missing}")
-        return
+    # clave por archivo + filtros: cambiar reglas/parámetros solo recalcula sus máscaras
+    df_validado, df_alertas = run_qa(df, cfg, key=qa_key(uploaded_file, cfg))
 
-    df = normalize_df(df)
-    df = apply_filters(df, cfg)
-
-    if df.empty:
+    if df_validado.empty:
         st.warning("Después de aplicar los filtros, no quedaron filas para validar.")
         return
 
-    df_validado = apply_validations(df, cfg)
-    df_alertas = df_validado[df_validado["Alertas"] != ""]
-
     st.subheader("Resultado")
     if not df_alertas.empty:
         st.success(f"Se encontraron {len(df_alertas)} filas con alertas.")
-        st.dataframe(df_alertas, use_container_width=True)
-        data = download_excel(df_alertas, sheet_name="Alertas", filename="alertas_QA_inventory.xlsx")
-        st.download_button("📥 Descargar Excel con Alertas", data=data, file_name="alertas_QA_inventory.xlsx",
-                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        result_viewer(df_alertas, key="qa_alertas", alert_labels=ALERT_LABELS)
+        export_panel(df_alertas, "Alertas", "alertas_QA_inventory", "reporte de alertas", key="export_qa")
     else:
         st.success("No se encontraron alertas. ¡Todo OK!")
+    history_button("qa", df_validado, key="history_qa")
 
 if __name__ == "__main__":
+    profile = start_run("qa")  # etapas de este rerun, para el panel de debug
     main()
+    profiling_panel(profile, key="qa")
 
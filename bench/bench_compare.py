@@ -0,0 +1,139 @@
+# bench/bench_compare.py
+# Paridad y tiempos de compare_cmdb_intune / compare_cmdb_ad (alertas por np.select) vs la
+# implementación anterior con `apply(build_alert, axis=1)`, sobre bench/generators.py.
+# Uso:  python -m bench.bench_compare [--sizes 10000 200000] [--seeds 0 1 2 3 4]
+# Sale con código 1 si alguna semilla da un resultado distinto.
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+from bench.generators import generate_ad, generate_cmdb, generate_intune
+from lib.cmdb_utils import cmdb_std_cols, normalize_cmdb
+from lib.compare_ad import compare_cmdb_ad, normalize_ad
+from lib.compare_intune import compare_cmdb_intune, normalize_intune
+from lib.pipelines import cmdb_emails
+
+def legacy_compare_cmdb_intune(cmdb_std: pd.DataFrame, intune_std: pd.DataFrame) -> pd.DataFrame:
+    # Copia de referencia de la versión anterior (lib/compare_intune.py) para comparar salida y tiempos.
+    left = cmdb_std.copy()
+    left["email"] = left["email"].str.lower()
+    left["hostname"] = left["hostname"].str.lower()
+
+    dup_cmdb = left.duplicated(subset=["serial"], keep=False)
+    dup_intune = intune_std.duplicated(subset=["serial"], keep=False)
+
+    intune_first = intune_std.drop_duplicates(subset=["serial"], keep="first")
+
+    merged = left.merge(intune_first, on="serial", how="left", suffixes=("_cmdb", "_intune"), indicator=True)
+
+    def build_alert(row):
+        alerts = []
+        if row["_merge"] == "left_only":
+            alerts.append("Serie no existe en Intune")
+        else:
+            if row["email_cmdb"] and row["email_intune"] and row["email_cmdb"] != row["email_intune"]:
+                alerts.append("Correo no coincide")
+            if row["hostname_cmdb"] and row["hostname_intune"] and row["hostname_cmdb"] != row["hostname_intune"]:
+                alerts.append("Hostname no coincide")
+        return "; ".join(alerts)
+
+    merged["Alertas"] = merged.apply(build_alert, axis=1)
+
+    merged["Duplicado en CMDB (serial)"] = merged["serial"].isin(left.loc[dup_cmdb, "serial"])
+    merged["Duplicado en Intune (serial)"] = merged["serial"].isin(intune_std.loc[dup_intune, "serial"])
+
+    cols = [
+        "serial",
+        "email_cmdb", "email_intune",
+        "hostname_cmdb", "hostname_intune",
+        "Duplicado en CMDB (serial)", "Duplicado en Intune (serial)",
+        "Alertas"
+    ]
+    return merged[cols]
+
+def legacy_compare_cmdb_ad(cmdb_emails: pd.DataFrame, ad_std: pd.DataFrame) -> pd.DataFrame:
+    # Copia de referencia de la versión anterior (lib/compare_ad.py).
+    cm = cmdb_emails.copy()
+    cm["email"] = cm["email"].str.lower()
+
+    merged = cm.merge(ad_std, on="email", how="left", indicator=True)
+
+    def build_alert(row):
+        if row["_merge"] == "left_only":
+            return "Correo no existe en AD"
+        if row["enabled"] is False:
+            return "Cuenta deshabilitada en AD"
+        if row["enabled"] is None:
+            return "Estado Enabled desconocido en AD"
+        return ""
+
+    merged["Alertas"] = merged.apply(build_alert, axis=1)
+    return merged[["email", "enabled", "Alertas"]]
+
+def _as_object(df: pd.DataFrame) -> pd.DataFrame:
+    """Entradas como las recibía la versión anterior: str de Python y enabled True / False / None."""
+    df = df.astype({c: object for c in df.columns if c != "enabled"})
+    if "enabled" in df:
+        df["enabled"] = df["enabled"].astype(object).map(lambda v: None if v is pd.NA else bool(v))
+    return df
+
+def _comparable(df: pd.DataFrame) -> pd.DataFrame:
+    """Mismos valores sin depender de los dtypes (string / categórica / boolean vs object)."""
+    out = pd.DataFrame(index=pd.RangeIndex(len(df)))
+    for c in df.columns:
+        s = df[c].reset_index(drop=True)
+        if c == "enabled":
+            # None (desconocido) y NaN (sin match) de la versión anterior son <NA> en la nueva
+            out[c] = s.astype(object).map(lambda v: pd.NA if v is None or v is pd.NA or v != v else bool(v)).astype("boolean")
+        elif s.dtype == bool:
+            out[c] = s
+        else:
+            out[c] = s.astype(object).where(s.notna(), None).astype(str)
+    return out
+
+def make_inputs(n: int, seed: int):
+    raw = normalize_cmdb(generate_cmdb(n, seed=seed, extra_cols=0))
+    intune = normalize_intune(generate_intune(raw, n, seed=seed + 1, extra_cols=0))
+    ad = normalize_ad(generate_ad(raw, n, seed=seed + 2, extra_cols=0))
+    return cmdb_std_cols(raw), cmdb_emails(raw), intune, ad
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+def check(name: str, new_fn, old_fn, left: pd.DataFrame, right: pd.DataFrame) -> bool:
+    new, t_new = _timed(new_fn, left, right)
+    old, t_old = _timed(old_fn, _as_object(left), _as_object(right))
+    try:
+        pd.testing.assert_frame_equal(_comparable(new), _comparable(old))
+        same = True
+    except AssertionError as e:
+        print(e)
+        same = False
+    counts = new["Alertas"].astype(str).replace("", "(sin alerta)").value_counts()
+    detail = ", ".join(f"{a}: {n}" for a, n in counts.items())
+    print(f"  {name:<7} {len(new):>9} {t_new:>10.3f} {t_old:>10.3f} {t_old / t_new:>7.1f}x  {same}  ({detail})")
+    return same
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Paridad de compare_cmdb_intune / compare_cmdb_ad con la versión apply(axis=1)")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 200_000])
+    ap.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2, 3, 4])
+    args = ap.parse_args()
+
+    ok = True
+    print(f"  {'':<7} {'filas':>9} {'nuevo (s)':>10} {'legacy (s)':>10} {'speedup':>8}  iguales")
+    for n in args.sizes:
+        for seed in args.seeds:
+            print(f"n={n} seed={seed}")
+            left, emails, intune, ad = make_inputs(n, seed)
+            ok &= check("intune", compare_cmdb_intune, legacy_compare_cmdb_intune, left, intune)
+            ok &= check("ad", compare_cmdb_ad, legacy_compare_cmdb_ad, emails, ad)
+    print("OK: mismas alertas en todas las semillas" if ok else "DIFERENCIAS: ver arriba")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# bench/bench_validations.py
+# Escalamiento de apply_validations (motor por bitmask) vs la implementación anterior
+# con `.loc[...] +=`. Uso:  python -m bench.bench_validations [--sizes 100000 1000000 5000000]
+# Sale con código 1 si algún tamaño da alertas distintas.
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from lib.pipelines import DEFAULT_CFG
+from lib.validations import apply_validations
+
+def legacy_apply_validations(df: pd.DataFrame, cfg) -> pd.DataFrame:
+    # Copia de referencia de la versión anterior (app.py) para comparar tiempos y salida.
+    r = cfg["rules"]; p = cfg["params"]
+    df = df.copy()
+    df["Alertas"] = ""
+    if r["serie"]["vacio"]:
+        df.loc[df["Número de serie"] == "", "Alertas"] += "Serie vacía. "
+    if r["serie"]["espacios"]:
+        df.loc[df["Número de serie"].str.contains(" "), "Alertas"] += "Serie contiene espacios. "
+    if r["serie"]["minlen"]:
+        df.loc[df["Número de serie"].str.len() < int(p["minlen_serie"]), "Alertas"] += "Serie menor a longitud mínima. "
+    if r["host"]["vacio"]:
+        df.loc[df["Hostname"] == "", "Alertas"] += "Hostname vacío. "
+    if r["host"]["espacios"]:
+        df.loc[df["Hostname"].str.contains(" "), "Alertas"] += "Hostname contiene espacios. "
+    if r["host"]["minlen"]:
+        df.loc[df["Hostname"].str.len() < int(p["minlen_host"]), "Alertas"] += "Hostname menor a longitud mínima. "
+    if r["mail"]["vacio"]:
+        df.loc[df["Correo Electrónico"] == "", "Alertas"] += "Correo vacío. "
+    if r["mail"]["espacios"]:
+        df.loc[df["Correo Electrónico"].str.contains(" "), "Alertas"] += "Correo contiene espacios. "
+    if r["mail"]["dominio"]:
+        allowed = p["allowed_domains"]
+        if allowed:
+            mask_domain = ~df["Correo Electrónico"].str.lower().apply(lambda x: any(d in x for d in allowed))
+            df.loc[mask_domain, "Alertas"] += "Correo no pertenece a dominios permitidos. "
+    dup_serie = df["Número de serie"].duplicated(keep=False) & (df["Número de serie"] != "")
+    dup_host = df["Hostname"].duplicated(keep=False) & (df["Hostname"] != "")
+    dup_mail = df["Correo Electrónico"].duplicated(keep=False) & (df["Correo Electrónico"] != "")
+    if r["dups"]["serie"]:
+        df.loc[dup_serie, "Alertas"] += "Serie duplicada. "
+    if r["dups"]["host"]:
+        df.loc[dup_host, "Alertas"] += "Hostname duplicado. "
+    if r["dups"]["mail"]:
+        df.loc[dup_mail, "Alertas"] += "Correo duplicado. "
+    return df
+
+def make_frame(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    serial = pd.Series(rng.integers(0, n, n)).map("SN{:08d}".format)
+    serial[rng.random(n) < 0.01] = ""
+    host = pd.Series(rng.integers(0, n, n)).map("PC{:06d}".format)
+    host[rng.random(n) < 0.01] = "PC 1"
+    domains = np.array(["pacifico.com.pe", "prima.com.pe", "gmail.com"])
+    mail = "u" + pd.Series(rng.integers(0, n, n)).astype(str) + "@" + domains[rng.integers(0, 3, n)]
+    mail[rng.random(n) < 0.02] = ""
+    return pd.DataFrame({
+        "Número de serie": serial,
+        "Hostname": host,
+        "Tipo": "Notebook",
+        "Correo Electrónico": mail,
+        "Clasificación Distribución": "Distribuidos",
+    })
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark de apply_validations")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    ap.add_argument("--skip-legacy", action="store_true", help="no medir la versión anterior")
+    args = ap.parse_args()
+
+    ok = True
+    print(f"{'filas':>10} {'bitmask (s)':>12} {'legacy (s)':>12} {'speedup':>8}  iguales")
+    for n in args.sizes:
+        df = make_frame(n)
+        new, t_new = _timed(apply_validations, df, DEFAULT_CFG)
+        if args.skip_legacy:
+            print(f"{n:>10} {t_new:>12.3f} {'-':>12} {'-':>8}  -")
+            continue
+        old, t_old = _timed(legacy_apply_validations, df, DEFAULT_CFG)
+        same = bool((new["Alertas"].to_numpy() == old["Alertas"].to_numpy()).all())
+        ok &= same
+        print(f"{n:>10} {t_new:>12.3f} {t_old:>12.3f} {t_old / t_new:>7.1f}x  {same}")
+    if not ok:
+        print("DIFERENCIAS: la versión bitmask no da las mismas alertas que la anterior")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# bench/generators.py
+# Generadores sintéticos (con semilla) de CMDB, Intune y AD con las columnas exactas que usa lib/
+import numpy as np
+import pandas as pd
+
+from lib.io_utils import _write_xlsx
+
+DOMAINS = np.array(["pacifico.com.pe", "prima.com.pe", "pacificoseguros.com", "gmail.com"])
+TIPOS = np.array(["Notebook", "Desktop", "NOTEBOOK", "Servidor", "Impresora"])
+CLASIFICACION = np.array(["Distribuidos", "Distribuido", "distribuidos", "Almacén", "Baja"])
+# con tildes/ñ: sin ellas un CSV cp1252 es indistinguible de uno UTF-8
+NOMBRES = np.array(["José Peña", "María Núñez", "Ángel Castañeda", "Lucía Ibáñez", "Juan Pérez"])
+
+# CSV tal como llegan: AD suele venir en UTF-16 con BOM y tab; Intune en UTF-8 con coma
+CSV_VARIANTS = {
+    "utf16_tab": {"encoding": "utf-16", "sep": "\t"},
+    "utf8_comma": {"encoding": "utf-8", "sep": ","},
+    "utf8sig_semicolon": {"encoding": "utf-8-sig", "sep": ";"},
+    "cp1252_semicolon": {"encoding": "cp1252", "sep": ";"},
+}
+
+def _pick(rng, values, n, p=None):
+    return values[rng.choice(len(values), n, p=p)]
+
+def _dirty(rng, s: pd.Series, frac: float, values) -> pd.Series:
+    s = s.copy()
+    mask = rng.random(len(s)) < frac
+    s[mask] = _pick(rng, np.array(values, dtype=object), int(mask.sum()))
+    return s
+
+def _serial_noise(rng, s: pd.Series, frac: float) -> pd.Series:
+    """Mismo equipo escrito distinto: minúsculas, prefijo S/N, guion o un carácter cambiado."""
+    s = s.copy()
+    kind = np.where(rng.random(len(s)) < frac, rng.integers(0, 4, len(s)), -1)
+    s[kind == 0] = s[kind == 0].str.lower()
+    s[kind == 1] = "S/N " + s[kind == 1]
+    s[kind == 2] = s[kind == 2].str.slice(0, 3) + "-" + s[kind == 2].str.slice(3)
+    s[kind == 3] = s[kind == 3].str.slice(0, -1) + "X"
+    return s
+
+def generate_cmdb(n: int, seed: int = 0, extra_cols: int = 50) -> pd.DataFrame:
+    """CMDB cruda: ~55 columnas, duplicados, vacíos, espacios y seriales numéricos."""
+    rng = np.random.default_rng(seed)
+    serial = pd.Series(rng.integers(0, n * 10, n)).map("5CG{:07d}".format).astype(object)
+    serial = _dirty(rng, serial, 0.01, ["", " ", "ABC 123", "123", None])
+    serial[rng.random(n) < 0.02] = serial.iloc[0]  # seriales duplicados
+    numeric = rng.random(n) < 0.01
+    serial[numeric] = rng.integers(10_000_000, 99_999_999, int(numeric.sum()))  # Excel los lee como número
+
+    host = pd.Series(rng.integers(0, n * 10, n)).map("PCPAC{:06d}".format).astype(object)
+    host = _dirty(rng, host, 0.01, ["", "PC 01", "PC1", None])
+
+    user = pd.Series(rng.integers(0, n, n)).map("usuario{}".format)
+    mail = (user + "@" + _pick(rng, DOMAINS, n, p=[0.5, 0.3, 0.15, 0.05])).astype(object)
+    mail = _dirty(rng, mail, 0.02, ["", " x@pacifico.com.pe", "sin correo", None])
+
+    df = pd.DataFrame({
+        "Número de serie": serial,
+        "Hostname": host,
+        "Tipo": _pick(rng, TIPOS, n, p=[0.45, 0.3, 0.1, 0.1, 0.05]),
+        "Correo Electrónico": mail,
+        "Clasificación Distribución": _pick(rng, CLASIFICACION, n, p=[0.4, 0.2, 0.1, 0.2, 0.1]),
+    })
+    for i in range(extra_cols):
+        df[f"Campo {i:02d}"] = rng.integers(0, 1000, n) if i % 2 else _pick(rng, np.array(["A", "B", "C"]), n)
+    return df
+
+def generate_intune(cmdb: pd.DataFrame, n: int, seed: int = 1, extra_cols: int = 20) -> pd.DataFrame:
+    """Export de Intune que cruza ~80% con la CMDB (con diferencias de correo / hostname y ~5% de
+    series con otro formato)."""
+    rng = np.random.default_rng(seed)
+    base = cmdb.sample(n=min(n, len(cmdb)), random_state=seed, replace=n > len(cmdb)).reset_index(drop=True)
+    serial = base["Número de serie"].astype(str).where(rng.random(len(base)) < 0.8,
+                                                       pd.Series(rng.integers(0, 10**9, len(base))).map("INT{:09d}".format))
+    serial = _serial_noise(rng, serial, 0.05)
+    email = base["Correo Electrónico"].fillna("").astype(str).str.upper()
+    email = email.where(rng.random(len(base)) > 0.05, "otro@pacifico.com.pe")
+    host = base["Hostname"].fillna("").astype(str).where(rng.random(len(base)) > 0.05, "OTROHOST")
+
+    df = pd.DataFrame({
+        "Device ID": [f"{i:08x}-0000" for i in range(len(base))],
+        "Device name": host,
+        "Serial number": serial,
+        "Primary user UPN": email,
+        "Primary user display name": _pick(rng, NOMBRES, len(base)),
+        "OS": _pick(rng, np.array(["Windows", "macOS"]), len(base), p=[0.95, 0.05]),
+    })
+    df.loc[rng.random(len(df)) < 0.01, "Serial number"] = df["Serial number"].iloc[0]  # duplicados
+    for i in range(extra_cols):
+        df[f"Columna {i:02d}"] = rng.integers(0, 100, len(df))
+    return df
+
+def generate_ad(cmdb: pd.DataFrame, n: int, seed: int = 2, extra_cols: int = 10) -> pd.DataFrame:
+    """Export de AD con EmailAddress/Enabled en todas sus variantes (True, Verdadero, 0, vacío...)."""
+    rng = np.random.default_rng(seed)
+    emails = cmdb["Correo Electrónico"].dropna().astype(str).str.strip().unique()
+    emails = emails[rng.permutation(len(emails))][: int(n * 0.9)]
+    extra = pd.Series(rng.integers(0, 10**7, n - len(emails))).map("ad{}@prima.com.pe".format).to_numpy()
+    email = np.concatenate([emails, extra]).astype(object)
+    enabled = _pick(rng, np.array(["True", "False", "Verdadero", "Falso", "1", "0", "", "desconocido"], dtype=object),
+                    len(email), p=[0.6, 0.15, 0.1, 0.05, 0.03, 0.03, 0.02, 0.02])
+    df = pd.DataFrame({
+        "SamAccountName": [f"u{i}" for i in range(len(email))],
+        "DisplayName": _pick(rng, NOMBRES, len(email)),
+        "EmailAddress": email,
+        "Enabled": enabled,
+    })
+    df.loc[rng.random(len(df)) < 0.01, "EmailAddress"] = ""
+    for i in range(extra_cols):
+        df[f"Atributo {i:02d}"] = _pick(rng, np.array(["x", "y", "z"]), len(df))
+    return df
+
+def cmdb_xlsx_bytes(cmdb: pd.DataFrame) -> bytes:
+    return _write_xlsx(cmdb, "CMDB")
+
+def csv_bytes(df: pd.DataFrame, variant: str = "utf8_comma") -> bytes:
+    v = CSV_VARIANTS[variant]
+    return df.to_csv(index=False, sep=v["sep"]).encode(v["encoding"], errors="replace")
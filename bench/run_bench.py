@@ -0,0 +1,158 @@
+# bench/run_bench.py
+# Benchmark por etapa (tiempo y pico de memoria) sobre datos sintéticos de bench/generators.py.
+# Uso:  python -m bench.run_bench [--sizes 10000 100000] [--label rama-x] [--compare results/xxx.json]
+# Cada corrida se guarda en bench/results/<fecha>_<label>.json y se compara contra la anterior.
+import argparse
+import glob
+import json
+import os
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+
+from bench.generators import CSV_VARIANTS, csv_bytes, cmdb_xlsx_bytes, generate_ad, generate_cmdb, generate_intune
+from lib.cmdb_utils import CMDB_READ, cmdb_std_cols, normalize_cmdb
+from lib.compare_ad import compare_cmdb_ad, normalize_ad
+from lib.compare_intune import compare_cmdb_intune, normalize_intune
+from lib.io_utils import read_csv_smart, read_excel_xlsx
+from lib.pipelines import DEFAULT_CFG, QA_READ, combine_tenants, normalize_df
+from lib.reconcile import reconcile_devices
+from lib.serial_match import propose_serial_matches
+from lib.validations import apply_validations
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+def measure(stage: str, n: int, fn, *args, repeat: int = 1, memory: bool = True):
+    """Ejecuta `fn(*args)`: mejor tiempo de `repeat` corridas y pico de memoria (tracemalloc) aparte."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    peak_mb = None
+    if memory:
+        # corrida separada: tracemalloc agrega overhead y no debe contaminar el tiempo
+        tracemalloc.start()
+        fn(*args)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    rows_out = len(out) if hasattr(out, "__len__") else None
+    # memoria del frame resultante (deep: cuenta los str de Python de las columnas object)
+    frame_mb = out.memory_usage(deep=True).sum() / 2**20 if isinstance(out, pd.DataFrame) else None
+    rec = {"stage": stage, "size": n, "seconds": round(best, 4),
+           "peak_mb": None if peak_mb is None else round(peak_mb, 1), "rows_out": rows_out,
+           "frame_mb": None if frame_mb is None else round(frame_mb, 2)}
+    print(f"{n:>9} {stage:<42} {best:>9.3f}s {'' if peak_mb is None else f'{peak_mb:>9.1f} MB'}"
+          f"{'' if frame_mb is None else f'{frame_mb:>10.2f} MB'}")
+    return out, rec
+
+def run_size(n: int, seed: int, repeat: int, memory: bool, variants) -> list:
+    raw_cmdb = generate_cmdb(n, seed, extra_cols=20)
+    intune = generate_intune(raw_cmdb, n, seed + 1)
+    ad = generate_ad(raw_cmdb, n, seed + 2)
+    xlsx = cmdb_xlsx_bytes(raw_cmdb)
+
+    recs = []
+    def m(stage, fn, *args):
+        out, rec = measure(stage, n, fn, *args, repeat=repeat, memory=memory)
+        recs.append(rec)
+        return out
+
+    # BytesIO nuevo en cada llamada: los lectores consumen el buffer
+    raw = m("read_excel_xlsx", lambda: read_excel_xlsx(BytesIO(xlsx)))
+    # lectura por columnas (+ filtro Distribuido(s) en Intune/AD) como la hacen QA e Intune/AD
+    m("read_excel_xlsx[qa]", lambda: read_excel_xlsx(BytesIO(xlsx), **QA_READ))
+    m("read_excel_xlsx[cmdb]", lambda: read_excel_xlsx(BytesIO(xlsx), **CMDB_READ))
+    df = m("normalize_df", normalize_df, raw)
+    m("apply_validations", apply_validations, df, DEFAULT_CFG)
+    cmdb = m("normalize_cmdb", normalize_cmdb, raw)
+    cmdb_std = cmdb_std_cols(cmdb)
+
+    for v in variants:
+        data = csv_bytes(intune, v)
+        m(f"read_csv_smart[intune/{v}]", lambda: read_csv_smart(BytesIO(data)))
+    for v in variants:
+        data = csv_bytes(ad, v)
+        m(f"read_csv_smart[ad/{v}]", lambda: read_csv_smart(BytesIO(data)))
+
+    intune_std = m("normalize_intune", normalize_intune, intune.astype(str))
+    result = m("compare_cmdb_intune", compare_cmdb_intune, cmdb_std, intune_std)
+    m("propose_serial_matches", propose_serial_matches, result, intune_std)
+
+    ad_std = m("normalize_ad", normalize_ad, ad)
+    # dos tenants con las mismas cuentas (estado distinto en algunas): unión + conflictos
+    ad_other = normalize_ad(generate_ad(raw_cmdb, n, seed + 3))
+    m("combine_tenants[ad]", lambda: combine_tenants({"pacifico": (ad_std, None), "prima": (ad_other, None)},
+                                                     "email", ["enabled"])[0])
+    cmdb_emails = cmdb_std[["email"]].assign(email=cmdb_std["email"].str.lower()).drop_duplicates()
+    m("compare_cmdb_ad", compare_cmdb_ad, cmdb_emails, ad_std)
+    # las dos conciliaciones en una pasada (mismo resultado que compare_cmdb_intune + compare_cmdb_ad)
+    m("reconcile_devices", reconcile_devices, cmdb_std, intune_std, ad_std)
+    return recs
+
+def save_results(records: list, args) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}_{args.label}.json")
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({
+            "label": args.label,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "records": records,
+        }, fh, indent=2, ensure_ascii=False)
+    return path
+
+def previous_result(exclude: str):
+    files = sorted(p for p in glob.glob(os.path.join(RESULTS_DIR, "*.json")) if os.path.abspath(p) != os.path.abspath(exclude))
+    return files[-1] if files else None
+
+def compare(current: list, baseline_path: str) -> pd.DataFrame:
+    with open(baseline_path, encoding="utf-8") as fh:
+        base = pd.DataFrame(json.load(fh)["records"])
+    if "frame_mb" not in base:
+        base["frame_mb"] = None  # resultados de antes de medir el frame
+    curr = pd.DataFrame(current)
+    out = curr.merge(base, on=["stage", "size"], how="left", suffixes=("", "_base"))
+    num = ["seconds", "seconds_base", "peak_mb", "peak_mb_base", "frame_mb", "frame_mb_base"]
+    out[num] = out[num].astype(float)  # peak_mb es None si se corrió con --no-memory
+    out["tiempo_%"] = ((out["seconds"] / out["seconds_base"] - 1) * 100).round(1)
+    out["memoria_%"] = ((out["peak_mb"] / out["peak_mb_base"] - 1) * 100).round(1)
+    out["frame_%"] = ((out["frame_mb"] / out["frame_mb_base"] - 1) * 100).round(1)
+    return out[["size", "stage", "seconds_base", "seconds", "tiempo_%", "peak_mb_base", "peak_mb", "memoria_%",
+                "frame_mb_base", "frame_mb", "frame_%"]]
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark por etapa de la app de QA de CMDB")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000])
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=1, help="corridas por etapa (se reporta la mejor)")
+    ap.add_argument("--variants", nargs="+", default=list(CSV_VARIANTS), choices=list(CSV_VARIANTS))
+    ap.add_argument("--no-memory", action="store_true", help="no medir pico de memoria (más rápido)")
+    ap.add_argument("--label", default="local", help="etiqueta de la corrida (rama, commit...)")
+    ap.add_argument("--compare", help="JSON de una corrida anterior (por defecto, la más reciente)")
+    ap.add_argument("--no-save", action="store_true")
+    args = ap.parse_args()
+
+    print(f"{'filas':>9} {'etapa':<42} {'tiempo':>10} {'pico':>12} {'frame':>12}")
+    records = []
+    for n in args.sizes:
+        records += run_size(n, args.seed, args.repeat, not args.no_memory, args.variants)
+
+    path = "" if args.no_save else save_results(records, args)
+    baseline = args.compare or previous_result(path)
+    if baseline:
+        print(f"\nComparación contra {baseline} (%: positivo = peor)")
+        with pd.option_context("display.width", 200, "display.max_rows", None):
+            print(compare(records, baseline).to_string(index=False))
+    if path:
+        print(f"\nResultados guardados en {path}")
+
+if __name__ == "__main__":
+    main()
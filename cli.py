@@ -0,0 +1,185 @@
+# cli.py
+# Modo batch (sin navegador) de las mismas validaciones y conciliaciones de la app.
+# Uso:
+#   python cli.py qa --cmdb inventario.xlsx [--config reglas.json] [--out-dir reportes]
+#   python cli.py intune --cmdb cmdb.xlsx --tenant pacifico=intune_pac.csv --tenant prima=intune_pri.csv
+#   python cli.py ad --cmdb cmdb.xlsx --tenant pacifico=ad_pac.csv --tenant prima=ad_pri.csv [--incremental]
+#   python cli.py conciliacion --cmdb cmdb.xlsx --intune pacifico=intune_pac.csv --ad pacifico=ad_pac.csv ...
+# --cmdb también acepta la ruta de un snapshot .parquet de la CMDB normalizada.
+# Cada corrida de qa / intune / ad se agrega al historial de alertas (CMDB_HISTORY=0 para no guardarla).
+import argparse
+import copy
+import json
+import os
+import sqlite3
+import sys
+
+from lib.alert_history import HISTORY_ENABLED, record_run
+from lib.ingest import LocalFile
+from lib.io_utils import EXPORT_FORMATS, export_bytes
+from lib.pipelines import DEFAULT_CFG, load_qa_cmdb, run_ad, run_intune, run_qa, run_reconcile
+from lib.profiling import profile_run
+
+def _merge(base: dict, override: dict) -> dict:
+    out = copy.deepcopy(base)
+    for k, v in override.items():
+        if isinstance(v, dict) and isinstance(out.get(k), dict):
+            out[k] = _merge(out[k], v)
+        else:
+            out[k] = v
+    return out
+
+def load_config(path: str) -> dict:
+    """Config de reglas (misma forma que el sidebar de app.py); las claves que falten toman el valor por defecto."""
+    if path is None:
+        return copy.deepcopy(DEFAULT_CFG)
+    with open(path, encoding="utf-8") as fh:
+        if path.lower().endswith((".yml", ".yaml")):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit("Para configs YAML instala PyYAML (pip install pyyaml) o usa JSON.")
+            override = yaml.safe_load(fh) or {}
+        else:
+            override = json.load(fh)
+    cfg = _merge(DEFAULT_CFG, override)
+    cfg["params"]["allowed_domains"] = [d.strip().lower() for d in cfg["params"]["allowed_domains"] if d.strip()]
+    return cfg
+
+def _cmdb_source(path: str):
+    return path if path.lower().endswith(".parquet") else LocalFile(path)
+
+def _tenants(values) -> dict:
+    files = {}
+    for v in values:
+        name, sep, path = v.partition("=")
+        if not sep or not name or not path:
+            raise SystemExit(f"--tenant espera NOMBRE=RUTA, no {v!r}")
+        files[name] = LocalFile(path)
+    return files
+
+def _write(df, args, filename: str, sheet_name: str) -> str:
+    ext, _ = EXPORT_FORMATS[args.format]
+    path = os.path.join(args.out_dir, f"{filename}.{ext}")
+    with open(path, "wb") as fh:
+        fh.write(export_bytes(df, args.format, sheet_name))
+    return path
+
+def _record(kind: str, result) -> None:
+    if not HISTORY_ENABLED or result.empty:
+        return
+    try:
+        run_id = record_run(kind, result)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Aviso: no se pudo guardar la corrida en el historial ({e})", file=sys.stderr)
+        return
+    print("Historial: corrida guardada" if run_id else "Historial: esta corrida ya estaba guardada hoy")
+
+def cmd_qa(args) -> int:
+    cfg = load_config(args.config)
+    df = load_qa_cmdb(LocalFile(args.cmdb))
+    df_validado, df_alertas = run_qa(df, cfg)
+    print(f"Filas validadas: {len(df_validado)} · filas con alertas: {len(df_alertas)}")
+    _record("qa", df_validado)
+    if not df_alertas.empty:
+        print(f"Reporte: {_write(df_alertas, args, 'alertas_QA_inventory', 'Alertas')}")
+    return 1 if args.fail_on_alerts and not df_alertas.empty else 0
+
+def _cmd_compare(args, kind: str, run, label: str, filename: str, sheet_name: str) -> int:
+    out = run(_cmdb_source(args.cmdb), _tenants(args.tenant), args.incremental)
+    timings = out["timings"]
+    print(f"Lectura: {timings.attrs['wall_s']:.2f}s")
+    print(timings.to_string(index=False))
+    alerts = out["alerts"]
+    print(f"Filas comparadas: {len(out['result'])} · filas con alertas ({label}): {len(alerts)}")
+    _record(kind, out["result"])
+    if out["delta"] is not None:
+        delta = out["delta"]
+        if out["prev_created"] is None:
+            print("Sin corrida anterior guardada: comparación completa.")
+        else:
+            print(f"Desde {out['prev_created']}: {int((delta['Estado'] == 'nueva').sum())} alertas nuevas, "
+                  f"{int((delta['Estado'] == 'resuelta').sum())} resueltas")
+            if not delta.empty:
+                print(f"Cambios: {_write(delta, args, f'cambios_{filename}', 'Cambios')}")
+    conflicts = out["conflicts"]
+    if not conflicts.empty:
+        print(f"Conflictos entre tenants: {len(conflicts)} · "
+              f"{_write(conflicts, args, f'conflictos_tenants_{label.lower()}', 'Conflictos')}")
+    matches = out.get("matches")
+    if matches is not None and not matches.empty:
+        print(f"Propuestas de match de serie: {len(matches)} · "
+              f"{_write(matches, args, f'propuestas_serie_{label.lower()}', 'Propuestas')}")
+    if not alerts.empty:
+        print(f"Reporte: {_write(alerts, args, filename, sheet_name)}")
+    return 1 if args.fail_on_alerts and not alerts.empty else 0
+
+def cmd_intune(args) -> int:
+    return _cmd_compare(args, "intune", run_intune, "Intune", "alertas_cmdb_intune_combinado", "Alertas_Intune")
+
+def cmd_ad(args) -> int:
+    return _cmd_compare(args, "ad", run_ad, "AD", "alertas_cmdb_ad_combinado", "Alertas_AD")
+
+def cmd_reconcile(args) -> int:
+    out = run_reconcile(_cmdb_source(args.cmdb), _tenants(args.intune), _tenants(args.ad))
+    timings = out["timings"]
+    print(f"Lectura: {timings.attrs['wall_s']:.2f}s")
+    print(timings.to_string(index=False))
+    s = out["summary"]
+    print(f"Equipos: {s['equipos']} · en Intune: {s['en_intune']} · en AD: {s['en_ad']} · "
+          f"usuario habilitado: {s['usuario_habilitado']} · con alertas: {s['con_alertas']}")
+    for source, conflicts in out["conflicts"].items():
+        if not conflicts.empty:
+            print(f"Conflictos entre tenants ({source}): {len(conflicts)} · "
+                  f"{_write(conflicts, args, f'conflictos_tenants_{source}', 'Conflictos')}")
+    alerts = out["alerts"]
+    if not alerts.empty:
+        print(f"Reporte: {_write(alerts, args, 'conciliacion_cmdb_intune_ad', 'Conciliacion')}")
+    return 1 if args.fail_on_alerts and not alerts.empty else 0
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="QA de CMDB y conciliaciones Intune / AD sin Streamlit")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--cmdb", required=True, help="CMDB .xlsx (o snapshot .parquet en intune/ad)")
+    common.add_argument("--out-dir", default=".", help="carpeta de los reportes (por defecto, la actual)")
+    common.add_argument("--format", default="xlsx", choices=list(EXPORT_FORMATS))
+    common.add_argument("--profile", metavar="JSON", help="guardar el perfil por etapa en este archivo")
+    common.add_argument("--fail-on-alerts", action="store_true", help="salir con código 1 si hay alertas")
+
+    sub = ap.add_subparsers(dest="command", required=True)
+    qa = sub.add_parser("qa", parents=[common], help="validaciones de inventario (app.py)")
+    qa.add_argument("--config", help="reglas en JSON (o YAML con PyYAML); ver DEFAULT_CFG en lib/pipelines.py")
+    qa.set_defaults(func=cmd_qa)
+
+    for name, func, text in (("intune", cmd_intune, "CMDB vs Intune"), ("ad", cmd_ad, "CMDB vs Active Directory")):
+        p = sub.add_parser(name, parents=[common], help=text)
+        p.add_argument("--tenant", action="append", required=True, metavar="NOMBRE=RUTA",
+                       help="CSV de un tenant (repetir por cada empresa)")
+        p.add_argument("--incremental", action="store_true",
+                       help="recalcular solo lo que cambió desde la última corrida guardada")
+        p.set_defaults(func=func)
+
+    rec = sub.add_parser("conciliacion", parents=[common], help="CMDB vs Intune vs AD en una pasada")
+    rec.add_argument("--intune", action="append", required=True, metavar="NOMBRE=RUTA",
+                     help="CSV de Intune de un tenant (repetir por cada empresa)")
+    rec.add_argument("--ad", action="append", required=True, metavar="NOMBRE=RUTA",
+                     help="CSV de AD de un tenant (repetir por cada empresa)")
+    rec.set_defaults(func=cmd_reconcile)
+    return ap
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    os.makedirs(args.out_dir, exist_ok=True)
+    with profile_run(args.command) as profile:
+        try:
+            code = args.func(args)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            code = 2
+    if args.profile:
+        with open(args.profile, "wb") as fh:
+            fh.write(profile.to_json())
+    return code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+# lib/alert_history.py
+# Historial local (SQLite, solo se agrega) de las corridas de QA, Intune y AD: conteos por alerta
+# para las tendencias y las filas con alerta por clave para la historia de cada equipo/cuenta.
+# Las tendencias leen una tabla chica (corrida x alerta); la historia de una clave usa el índice
+# (clave, corrida): ninguna consulta recorre las filas de todas las corridas.
+import hashlib
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from lib.alerts import NO_ALERT, alert_summary
+from lib.profiling import profiled
+from lib.validations import ALERT_LABELS
+
+HISTORY_DB = os.environ.get("CMDB_HISTORY_DB", os.path.join(".history", "alertas.sqlite"))
+HISTORY_ENABLED = os.environ.get("CMDB_HISTORY", "1") == "1"
+
+# tipo de corrida -> (columna clave del resultado, alertas individuales si no van separadas por "; ")
+HISTORY_KINDS = {
+    "qa": ("Número de serie", ALERT_LABELS),
+    "intune": ("serial", None),
+    "ad": ("email", None),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id     INTEGER PRIMARY KEY,
+    kind       TEXT NOT NULL,
+    created    TEXT NOT NULL,
+    day        TEXT NOT NULL,
+    digest     TEXT NOT NULL,
+    rows       INTEGER NOT NULL,
+    alert_rows INTEGER NOT NULL,
+    UNIQUE (kind, day, digest)
+);
+CREATE INDEX IF NOT EXISTS runs_kind_created ON runs (kind, created);
+CREATE TABLE IF NOT EXISTS run_counts (
+    run_id INTEGER NOT NULL,
+    alert  TEXT NOT NULL,
+    n      INTEGER NOT NULL,
+    PRIMARY KEY (run_id, alert)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS alert_sets (
+    set_id  INTEGER PRIMARY KEY,
+    alertas TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS alert_rows (
+    key    TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    set_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alert_rows_key ON alert_rows (key, run_id);
+"""
+
+_schema_ready = set()
+_recorded = set()  # (kind, día, digest) ya guardados por este proceso: los reruns no tocan la base
+_lock = threading.Lock()
+
+@contextmanager
+def _connect(path: str = None):
+    """Conexión por operación (Streamlit atiende cada sesión en su hilo): commit al salir y cierre."""
+    path = path or HISTORY_DB
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    con = sqlite3.connect(path)
+    try:
+        con.execute("PRAGMA journal_mode=WAL")  # lectores (la página) no bloquean al que escribe
+        con.execute("PRAGMA synchronous=NORMAL")
+        if path not in _schema_ready:
+            con.executescript(_SCHEMA)
+            _schema_ready.add(path)
+        with con:
+            yield con
+    finally:
+        con.close()
+
+def _digest(keys: pd.Series, alerts: pd.Series, rows: int) -> str:
+    h = hashlib.sha256(str(rows).encode())
+    h.update(pd.util.hash_pandas_object(pd.DataFrame({"k": keys, "a": alerts.astype(str)}),
+                                        index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+@profiled
+def record_run(kind: str, result: pd.DataFrame, when: datetime = None, path: str = None):
+    """Guarda una corrida (resultado con "Alertas") en el historial. Devuelve el run_id o None.
+
+    Solo se guardan los conteos por alerta y las filas con alerta (las demás están implícitas en
+    `rows`). La misma corrida repetida en el día (mismo resultado: reruns de Streamlit, el CLI
+    lanzado dos veces) se guarda una sola vez.
+    """
+    key_col, labels = HISTORY_KINDS[kind]
+    when = when or datetime.now()
+    alerts = result[result["Alertas"] != ""]
+    digest = _digest(alerts[key_col], alerts["Alertas"], len(result))
+    memo = (path or HISTORY_DB, kind, f"{when:%Y-%m-%d}", digest)
+    if memo in _recorded:
+        return None
+
+    counts = alert_summary(result["Alertas"], labels).drop(NO_ALERT, errors="ignore")
+    sets = alerts["Alertas"].astype("category")
+    sets = sets.cat.remove_unused_categories()
+    with _lock, _connect(path) as con:
+        cur = con.execute(
+            "INSERT OR IGNORE INTO runs (kind, created, day, digest, rows, alert_rows) VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, when.isoformat(timespec="seconds"), f"{when:%Y-%m-%d}", digest, len(result), len(alerts)))
+        # ya estaba en la base (otro proceso, o este antes de reiniciar): no se duplica
+        run_id = cur.lastrowid if cur.rowcount else None
+        if run_id is not None:
+            con.executemany("INSERT INTO run_counts (run_id, alert, n) VALUES (?, ?, ?)",
+                            [(run_id, a, int(n)) for a, n in counts.items()])
+            # cada combinación de alertas se guarda una vez; las filas llevan su id
+            con.executemany("INSERT OR IGNORE INTO alert_sets (alertas) VALUES (?)",
+                            [(str(c),) for c in sets.cat.categories])
+            ids = dict(con.execute(
+                f"SELECT alertas, set_id FROM alert_sets WHERE alertas IN ({','.join('?' * len(sets.cat.categories))})",
+                [str(c) for c in sets.cat.categories]).fetchall()) if len(sets.cat.categories) else {}
+            set_ids = pd.Series([ids[str(c)] for c in sets.cat.categories], dtype="int64").to_numpy()
+            keys = alerts[key_col].astype(str).to_numpy()
+            codes = sets.cat.codes.to_numpy()
+            keep = keys != ""  # sin clave no hay historia que consultar (cuentan igual en run_counts)
+            con.executemany("INSERT INTO alert_rows (key, run_id, set_id) VALUES (?, ?, ?)",
+                            zip(keys[keep].tolist(), [run_id] * int(keep.sum()), set_ids[codes[keep]].tolist()))
+    # solo después del commit: si la escritura falla, el próximo rerun lo vuelve a intentar
+    _recorded.add(memo)
+    return run_id
+
+def _until(until: str) -> str:
+    # fecha sin hora: incluye todo ese día
+    return (until + "T99") if until and len(until) == 10 else (until or "9999")
+
+def list_runs(kind: str, since: str = None, until: str = None, path: str = None) -> pd.DataFrame:
+    """Corridas guardadas de `kind` entre `since` y `until` (fechas ISO, inclusive)."""
+    with _connect(path) as con:
+        return pd.read_sql_query(
+            "SELECT run_id, created, rows, alert_rows FROM runs "
+            "WHERE kind = ? AND created >= ? AND created < ? ORDER BY created",
+            con, params=(kind, since or "", _until(until)))
+
+@profiled
+def alert_trend(kind: str, since: str = None, until: str = None, path: str = None) -> pd.DataFrame:
+    """Filas con cada alerta por corrida: una fila por corrida (índice = su fecha), una columna por alerta.
+
+    Dos corridas del mismo segundo son dos filas: nunca se suman entre sí.
+    """
+    with _connect(path) as con:
+        df = pd.read_sql_query(
+            "SELECT r.run_id, r.created, c.alert, c.n FROM runs r LEFT JOIN run_counts c ON c.run_id = r.run_id "
+            "WHERE r.kind = ? AND r.created >= ? AND r.created < ?",
+            con, params=(kind, since or "", _until(until)))
+    if df.empty:
+        return pd.DataFrame()
+    runs = df[["run_id", "created"]].drop_duplicates("run_id").sort_values(["created", "run_id"])
+    # (run_id, alert) es la clave de run_counts: pivot sin agregar
+    counts = df.dropna(subset=["alert"]).pivot(index="run_id", columns="alert", values="n")
+    # corridas sin alertas: sin filas en run_counts, van en cero
+    trend = counts.reindex(runs["run_id"]).fillna(0).astype("int64")
+    trend.index = pd.DatetimeIndex(pd.to_datetime(runs["created"]), name="created")
+    return trend
+
+@profiled
+def key_history(kind: str, key: str, since: str = None, until: str = None, path: str = None) -> pd.DataFrame:
+    """Historia de una clave (serie / correo): sus alertas en cada corrida ("" = sin alerta)."""
+    with _connect(path) as con:
+        return pd.read_sql_query(
+            "SELECT r.created, COALESCE(s.alertas, '') AS Alertas FROM runs r "
+            "LEFT JOIN alert_rows a ON a.run_id = r.run_id AND a.key = ? "
+            "LEFT JOIN alert_sets s ON s.set_id = a.set_id "
+            "WHERE r.kind = ? AND r.created >= ? AND r.created < ? ORDER BY r.created",
+            con, params=(key, kind, since or "", _until(until)))
@@ -0,0 +1,34 @@
+# lib/alerts.py
+# Columna "Alertas" como combinaciones de alertas individuales: conteos y filtros por alerta
+# sobre los códigos de la categórica (sin recorrer filas). Sin dependencias de UI.
+import numpy as np
+import pandas as pd
+
+NO_ALERT = "(sin alerta)"
+
+def alert_codes(alerts: pd.Series, labels: list = None):
+    """(código de categoría por fila, {alerta: códigos cuya combinación la incluye}).
+
+    Las combinaciones se separan por "; " salvo que se den `labels` (alertas individuales,
+    p.ej. los mensajes de QA que se concatenan sin separador).
+    """
+    cat = alerts if isinstance(alerts.dtype, pd.CategoricalDtype) else alerts.astype("category")
+    by_label = {}
+    for code, value in enumerate(cat.cat.categories):
+        value = str(value)
+        if value == "":
+            found = [NO_ALERT]
+        elif labels is None:
+            found = value.split("; ")
+        else:
+            found = [label for label in labels if label in value]
+        for label in found:
+            by_label.setdefault(label, []).append(code)
+    return cat.cat.codes.to_numpy(), by_label
+
+def alert_summary(alerts: pd.Series, labels: list = None) -> pd.Series:
+    """Filas por tipo de alerta (una fila con "a; b" cuenta en a y en b), calculado sin recorrer filas."""
+    codes, by_label = alert_codes(alerts, labels)
+    per_code = np.bincount(codes[codes >= 0], minlength=max((max(c) for c in by_label.values()), default=-1) + 1)
+    counts = pd.Series({label: int(per_code[c].sum()) for label, c in by_label.items()}, dtype="int64")
+    return counts[counts > 0].sort_values(ascending=False)
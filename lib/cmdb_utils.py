@@ -1,22 +1,33 @@
 # lib/cmdb_utils.py
 import pandas as pd
 
+from lib.dtypes import clean_str
+from lib.profiling import profiled
+
 CMDB_REQUIRED_MIN = ["Número de serie", "Correo Electrónico", "Hostname", "Clasificación Distribución"]
+DIST_VALUES = ["distribuido", "distribuidos"]
 
-def normalize_cmdb(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+# Lectura del Excel para normalize_cmdb: solo las columnas requeridas y solo las filas
+# Distribuido(s), descartadas mientras se recorre la hoja (ver read_excel_xlsx)
+CMDB_READ = {"columns": CMDB_REQUIRED_MIN, "row_filter": {"Clasificación Distribución": DIST_VALUES}}
 
+@profiled
+def normalize_cmdb(df: pd.DataFrame) -> pd.DataFrame:
     faltantes = [c for c in CMDB_REQUIRED_MIN if c not in df.columns]
     if faltantes:
         raise ValueError(f"Faltan columnas en CMDB: {faltantes}")
 
-    for c in CMDB_REQUIRED_MIN:
-        df[c] = df[c].map(lambda x: str(x).strip() if pd.notnull(x) else "")
-
-    df = df[df["Clasificación Distribución"].str.lower().isin(["distribuido", "distribuidos"])]
+    # primero el filtro: el resto de columnas solo se limpia en las filas que quedan
+    clasif = clean_str(df["Clasificación Distribución"])
+    keep = clasif.str.lower().isin(DIST_VALUES).to_numpy(dtype=bool)
+    df = df[keep].copy()
+    df["Clasificación Distribución"] = clasif[keep].astype("category")
+    for c in ("Número de serie", "Correo Electrónico", "Hostname"):
+        df[c] = clean_str(df[c])
 
     return df
 
+@profiled
 def cmdb_std_cols(df: pd.DataFrame) -> pd.DataFrame:
 
     return df.rename(columns={
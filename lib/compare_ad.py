@@ -1,43 +1,50 @@
 # lib/compare_ad.py
+import numpy as np
 import pandas as pd
 
+from lib.dtypes import STR_DTYPE, clean_str
+from lib.profiling import profiled, stage
+
 AD_REQUIRED = ["EmailAddress", "Enabled"]
+ENABLED_TRUE = ["true", "1", "yes", "y", "enabled", "verdadero"]
+ENABLED_FALSE = ["false", "0", "no", "n", "disabled", "falso"]
+AD_ALERTS = ["", "Correo no existe en AD", "Cuenta deshabilitada en AD", "Estado Enabled desconocido en AD"]
 
+@profiled
 def normalize_ad(df: pd.DataFrame) -> pd.DataFrame:
     faltantes = [c for c in AD_REQUIRED if c not in df.columns]
     if faltantes:
         raise ValueError(f"Faltan columnas en Active Directory: {faltantes}")
 
-    df = df.copy()
-    df["EmailAddress"] = df["EmailAddress"].map(lambda x: str(x).strip().lower() if pd.notnull(x) else "")
-
-    #meapeamos estado
-    def to_bool(v):
-        s = str(v).strip().lower()
-        if s in ("true", "1", "yes", "y", "enabled","verdadero"):
-            return True
-        if s in ("false", "0", "no", "n", "disabled","falso"):
-            return False
-        return None  # desconocido
-    df["Enabled"] = df["Enabled"].map(to_bool)
-    return df.rename(columns={"EmailAddress": "email", "Enabled": "enabled"})[["email", "enabled"]]
-
+    # estado: True / False / <NA> (desconocido) en un booleano nullable
+    state = df["Enabled"].astype(STR_DTYPE).str.strip().str.lower()
+    is_true = state.isin(ENABLED_TRUE).to_numpy(dtype=bool, na_value=False)
+    is_false = state.isin(ENABLED_FALSE).to_numpy(dtype=bool, na_value=False)
+    return pd.DataFrame({
+        "email": clean_str(df["EmailAddress"], lower=True),
+        "enabled": pd.arrays.BooleanArray(is_true, ~(is_true | is_false)),
+    }, index=df.index)
+
+def ad_alert_codes(enabled: pd.Series, no_ad: np.ndarray) -> np.ndarray:
+    """Código de AD_ALERTS por fila a partir del `enabled` (boolean) ya cruzado."""
+    # alertas por máscaras de columna, con la misma prioridad que la versión fila a fila
+    disabled = (enabled.eq(False) & enabled.notna()).to_numpy(dtype=bool, na_value=False)
+    unknown = enabled.isna().to_numpy()
+    return np.select([no_ad, disabled, unknown], [1, 2, 3], default=0)
+
+@profiled
 def compare_cmdb_ad(cmdb_emails: pd.DataFrame, ad_std: pd.DataFrame) -> pd.DataFrame:
 
-    cm = cmdb_emails.copy()
+    cm = cmdb_emails.astype({"email": STR_DTYPE})  # también uniforma frames de snapshots antiguos
     cm["email"] = cm["email"].str.lower()
+    ad_std = ad_std.astype({"email": STR_DTYPE, "enabled": "boolean"})
 
-    merged = cm.merge(ad_std, on="email", how="left", indicator=True)
-
-    def build_alert(row):
-        if row["_merge"] == "left_only":
-            return "Correo no existe en AD"
-        if row["enabled"] is False:
-            return "Cuenta deshabilitada en AD"
-        if row["enabled"] is None:
-            return "Estado Enabled desconocido en AD"
-        return ""
+    with stage("compare_cmdb_ad.merge", len(cm)) as info:
+        merged = cm.merge(ad_std, on="email", how="left", indicator=True)
+        info["rows_out"] = len(merged)
 
-    merged["Alertas"] = merged.apply(build_alert, axis=1)
+    no_ad = (merged["_merge"] == "left_only").to_numpy()
+    codes = ad_alert_codes(merged["enabled"], no_ad)
+    merged["Alertas"] = pd.Categorical.from_codes(codes, categories=AD_ALERTS)
     return merged[["email", "enabled", "Alertas"]]
 
@@ -1,34 +1,47 @@
 # lib/compare_intune.py
+import numpy as np
 import pandas as pd
 
+from lib.dtypes import STR_DTYPE, clean_str
+from lib.profiling import profiled, stage
+
 INTUNE_REQUIRED = ["Serial number", "Primary user UPN", "Device name"]
+INTUNE_ALERTS = ["", "Serie no existe en Intune", "Correo no coincide; Hostname no coincide",
+                 "Correo no coincide", "Hostname no coincide"]
 
+@profiled
 def normalize_intune(df: pd.DataFrame) -> pd.DataFrame:
     faltantes = [c for c in INTUNE_REQUIRED if c not in df.columns]
     if faltantes:
         raise ValueError(f"Faltan columnas en Intune: {faltantes}")
 
-    df = df.copy()
-    for c in INTUNE_REQUIRED:
-        df[c] = df[c].map(lambda x: str(x).strip() if pd.notnull(x) else "")
-
-    df_std = df.rename(columns={
-        "Serial number": "serial",
-        "Primary user UPN": "email",
-        "Device name": "hostname"
-    })[["serial", "email", "hostname"]]
-
-    df_std["serial"] = df_std["serial"]
-    df_std["email"] = df_std["email"].str.lower()
-    df_std["hostname"] = df_std["hostname"].str.lower()
-
-    return df_std
-
+    return pd.DataFrame({
+        "serial": clean_str(df["Serial number"]),
+        "email": clean_str(df["Primary user UPN"], lower=True),
+        "hostname": clean_str(df["Device name"], lower=True),
+    })
+
+def intune_alert_codes(merged: pd.DataFrame, no_intune: np.ndarray) -> np.ndarray:
+    """Código de INTUNE_ALERTS por fila a partir de email/hostname _cmdb e _intune ya cruzados."""
+    # alertas por máscaras de columna (equivalente a la versión fila a fila)
+    # (las filas sin match traen <NA> del lado Intune: cuentan como "sin diferencia")
+    email_diff = (
+        (merged["email_cmdb"] != "") & (merged["email_intune"] != "")
+        & (merged["email_cmdb"] != merged["email_intune"])
+    ).to_numpy(dtype=bool, na_value=False) & ~no_intune
+    host_diff = (
+        (merged["hostname_cmdb"] != "") & (merged["hostname_intune"] != "")
+        & (merged["hostname_cmdb"] != merged["hostname_intune"])
+    ).to_numpy(dtype=bool, na_value=False) & ~no_intune
+    return np.select([no_intune, email_diff & host_diff, email_diff, host_diff], [1, 2, 3, 4], default=0)
+
+@profiled
 def compare_cmdb_intune(cmdb_std: pd.DataFrame, intune_std: pd.DataFrame) -> pd.DataFrame:
 
-    left = cmdb_std.copy()
+    left = cmdb_std.astype(STR_DTYPE)  # también uniforma frames de snapshots antiguos (object)
     left["email"] = left["email"].str.lower()
     left["hostname"] = left["hostname"].str.lower()
+    intune_std = intune_std.astype({c: STR_DTYPE for c in ("serial", "email", "hostname")})
 
     dup_cmdb = left.duplicated(subset=["serial"], keep=False)
     dup_intune = intune_std.duplicated(subset=["serial"], keep=False)
@@ -36,20 +49,14 @@ def compare_cmdb_intune(cmdb_std: pd.DataFrame, intune_std: pd.DataFrame) -> pd.
     #vista previa
     intune_first = intune_std.drop_duplicates(subset=["serial"], keep="first")
 
-    merged = left.merge(intune_first, on="serial", how="left", suffixes=("_cmdb", "_intune"), indicator=True)
-
-    def build_alert(row):
-        alerts = []
-        if row["_merge"] == "left_only":
-            alerts.append("Serie no existe en Intune")
-        else:
-            if row["email_cmdb"] and row["email_intune"] and row["email_cmdb"] != row["email_intune"]:
-                alerts.append("Correo no coincide")
-            if row["hostname_cmdb"] and row["hostname_intune"] and row["hostname_cmdb"] != row["hostname_intune"]:
-                alerts.append("Hostname no coincide")
-        return "; ".join(alerts)
+    with stage("compare_cmdb_intune.merge", len(left)) as info:
+        merged = left.merge(intune_first, on="serial", how="left", suffixes=("_cmdb", "_intune"), indicator=True)
+        info["rows_out"] = len(merged)
 
-    merged["Alertas"] = merged.apply(build_alert, axis=1)
+    no_intune = (merged["_merge"] == "left_only").to_numpy()
+    codes = intune_alert_codes(merged, no_intune)
+    # categórica con categorías fijas: un código por fila y concat estable entre corridas
+    merged["Alertas"] = pd.Categorical.from_codes(codes, categories=INTUNE_ALERTS)
 
     # duplicados
     merged["Duplicado en CMDB (serial)"] = merged["serial"].isin(left.loc[dup_cmdb, "serial"])
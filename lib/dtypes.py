@@ -0,0 +1,18 @@
+# lib/dtypes.py
+# Tipos compactos para los frames normalizados: strings Arrow, categóricas y booleano nullable.
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (viene con streamlit)
+    STR_DTYPE = "string[pyarrow]"
+except ImportError:
+    STR_DTYPE = "string"
+
+def clean_str(s: pd.Series, lower: bool = False) -> pd.Series:
+    """Equivalente vectorizado de `str(x).strip()` (y `.lower()`), con "" para los nulos."""
+    if s.dtype.kind in "Mm":
+        s = s.astype(object)  # fechas: mismo texto que str(Timestamp)
+    out = s.astype(STR_DTYPE).str.strip()
+    if lower:
+        out = out.str.lower()
+    return out.fillna("")
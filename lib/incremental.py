@@ -0,0 +1,207 @@
+# lib/incremental.py
+import hashlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from lib.compare_ad import compare_cmdb_ad
+from lib.compare_intune import compare_cmdb_intune
+from lib.dtypes import STR_DTYPE
+from lib.profiling import profiled
+from lib.snapshots import HAS_PYARROW, find_snapshot, list_snapshots, load_snapshot, save_snapshot
+
+_OCC_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+# última corrida guardada por tipo, en memoria: la siguiente no relee sus tres Parquet
+_last_run = {}
+
+def row_digests(df: pd.DataFrame, key: str) -> np.ndarray:
+    """Un hash por fila (contenido + n° de aparición de su clave): identifica filas entre corridas."""
+    if df.empty:
+        return np.zeros(0, dtype=np.uint64)
+    # bool/nullable -> object: el mismo valor hashea igual venga de un snapshot Parquet o recién normalizado
+    df = df.astype({c: object for c in df.columns if df[c].dtype != object})
+    row_hash = pd.util.hash_pandas_object(df, index=False, categorize=False).to_numpy()
+    occ = df.groupby(key, sort=False).cumcount().to_numpy().astype(np.uint64)
+    return row_hash + occ * _OCC_MIX
+
+def _factorize(*cols: pd.Series):
+    """Códigos comunes para las claves de varias columnas (mismo dtype: sin isin sobre object)."""
+    codes, uniques = pd.factorize(pd.concat([c.astype(STR_DTYPE) for c in cols], ignore_index=True),
+                                  use_na_sentinel=False)
+    bounds = np.cumsum([0] + [len(c) for c in cols])
+    return [codes[a:b] for a, b in zip(bounds[:-1], bounds[1:])], pd.Index(uniques)
+
+def _key_mask(col: pd.Series, keys) -> np.ndarray:
+    """Equivalente a `col.isin(keys)` sobre códigos factorizados."""
+    (key_codes, col_codes), uniques = _factorize(pd.Series(keys, dtype=STR_DTYPE), col)
+    hit = np.zeros(len(uniques), dtype=bool)
+    hit[key_codes] = True
+    return hit[col_codes]
+
+def diff_by_key(prev: pd.DataFrame, curr: pd.DataFrame, key: str,
+                prev_digests: np.ndarray = None, curr_digests: np.ndarray = None) -> dict:
+    """Claves insertadas, actualizadas y eliminadas entre dos versiones de un dataset."""
+    old = row_digests(prev, key) if prev_digests is None else prev_digests
+    new = row_digests(curr, key) if curr_digests is None else curr_digests
+    new_rows = ~pd.Series(new).isin(old).to_numpy()
+    gone_rows = ~pd.Series(old).isin(new).to_numpy()
+
+    (old_codes, new_codes), uniques = _factorize(prev[key], curr[key])
+    in_prev = np.zeros(len(uniques), dtype=bool)
+    in_prev[old_codes] = True
+    in_curr = np.zeros(len(uniques), dtype=bool)
+    in_curr[new_codes] = True
+    changed = np.zeros(len(uniques), dtype=bool)
+    changed[new_codes[new_rows]] = True
+    changed[old_codes[gone_rows]] = True
+    return {
+        "inserted": uniques[changed & ~in_prev],
+        "updated": uniques[changed & in_prev & in_curr],
+        "deleted": uniques[changed & ~in_curr],
+        "digests": new,
+    }
+
+def _explode_alerts(result: pd.DataFrame, key: str) -> pd.DataFrame:
+    rows = result.loc[result["Alertas"] != "", [key, "Alertas"]]
+    rows = rows.assign(Alerta=rows["Alertas"].str.split("; ")).explode("Alerta")
+    return rows[[key, "Alerta"]].drop_duplicates()
+
+def alert_delta(prev_result: pd.DataFrame, result: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Alertas nuevas y resueltas entre dos corridas, por (clave, alerta)."""
+    merged = _explode_alerts(prev_result, key).merge(
+        _explode_alerts(result, key), on=[key, "Alerta"], how="outer", indicator=True
+    )
+    merged = merged[merged["_merge"] != "both"]
+    merged["Estado"] = np.where(merged["_merge"] == "right_only", "nueva", "resuelta")
+    return merged[[key, "Alerta", "Estado"]].reset_index(drop=True)
+
+@profiled
+def reconcile_incremental(compare, key: str, prev, left: pd.DataFrame, right: pd.DataFrame):
+    """Recalcula `compare(left, right)` solo para las claves que cambiaron desde `prev`.
+
+    `prev` es un dict {"left", "right", "result"} de la corrida anterior (o None); puede traer
+    "left_digests"/"right_digests" guardados para no re-hashear la corrida anterior.
+    Las alertas de una clave dependen solo de las filas con esa misma clave en ambos lados,
+    así que el resultado es idéntico al de una corrida completa.
+    Devuelve (result, delta, stats); stats incluye los digests actuales para la próxima corrida.
+    """
+    left = left.reset_index(drop=True)
+    if prev is None or len(prev["result"]) != len(prev["left"]):
+        return _reconcile_full(compare, key, left, right, prev)
+
+    prev_left_digests = prev.get("left_digests")
+    if prev_left_digests is None:
+        prev_left_digests = row_digests(prev["left"], key)
+    prev_index = pd.Index(prev_left_digests)
+    if not prev_index.is_unique:  # colisión de hash: no arriesgamos un resultado incorrecto
+        return _reconcile_full(compare, key, left, right, prev)
+
+    d_left = diff_by_key(prev["left"], left, key, prev_left_digests)
+    d_right = diff_by_key(prev["right"], right, key, prev.get("right_digests"))
+    changed = pd.Index([], dtype=STR_DTYPE).append(
+        [d[k] for d in (d_left, d_right) for k in ("inserted", "updated", "deleted")]).unique()
+
+    recompute = _key_mask(left[key], changed)
+    fresh = compare(left[recompute], right[_key_mask(right[key], changed)])
+    if len(fresh) != recompute.sum():
+        # duplicados del lado derecho expanden filas: no hay correspondencia 1:1 con la corrida anterior
+        return _reconcile_full(compare, key, left, right, prev)
+
+    # filas sin cambios: se reutiliza la fila de resultado de su misma fila en la corrida anterior
+    prev_pos = prev_index.get_indexer(d_left["digests"][~recompute])
+    prev_result = prev["result"].reset_index(drop=True)
+    result = pd.concat([prev_result.iloc[prev_pos], fresh], ignore_index=True)
+    positions = np.concatenate([np.flatnonzero(~recompute), np.flatnonzero(recompute)])
+    result = result.iloc[np.argsort(positions, kind="stable")].reset_index(drop=True)
+
+    # solo las claves recalculadas pueden tener alertas nuevas o resueltas
+    delta = alert_delta(prev_result[_key_mask(prev_result[key], changed)], fresh, key)
+    stats = {
+        "mode": "incremental",
+        "left": {k: len(d_left[k]) for k in ("inserted", "updated", "deleted")},
+        "right": {k: len(d_right[k]) for k in ("inserted", "updated", "deleted")},
+        "recomputed_keys": len(changed),
+        "recomputed_rows": int(recompute.sum()),
+        "rows": len(result),
+        "left_digests": d_left["digests"],
+        "right_digests": d_right["digests"],
+    }
+    return result, delta, stats
+
+def _reconcile_full(compare, key: str, left: pd.DataFrame, right: pd.DataFrame, prev):
+    result = compare(left, right)
+    if prev is None:
+        delta = alert_delta(result.iloc[:0], result.iloc[:0], key)
+    else:
+        delta = alert_delta(prev["result"], result, key)
+    stats = {"mode": "full", "recomputed_rows": len(left), "rows": len(result)}
+    return result, delta, stats
+
+def compare_cmdb_intune_incremental(prev, cmdb_std: pd.DataFrame, intune_std: pd.DataFrame):
+    return reconcile_incremental(compare_cmdb_intune, "serial", prev, cmdb_std, intune_std)
+
+def compare_cmdb_ad_incremental(prev, cmdb_emails: pd.DataFrame, ad_std: pd.DataFrame):
+    return reconcile_incremental(compare_cmdb_ad, "email", prev, cmdb_emails, ad_std)
+
+# --- Persistencia de corridas (snapshots Parquet) ---
+
+def run_hash(left: pd.DataFrame, right: pd.DataFrame) -> str:
+    h = hashlib.sha256()
+    for df in (left, right):
+        h.update(pd.util.hash_pandas_object(df, index=False, categorize=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+@profiled
+def save_run(kind: str, run_id: str, left: pd.DataFrame, right: pd.DataFrame, result: pd.DataFrame,
+             stats: dict = None) -> None:
+    stats = stats or {}
+    key = "serial" if kind == "intune" else "email"
+    left_d = stats.get("left_digests")
+    right_d = stats.get("right_digests")
+    left = left.reset_index(drop=True)
+    right = right.reset_index(drop=True)
+    left_d = row_digests(left, key) if left_d is None else left_d
+    right_d = row_digests(right, key) if right_d is None else right_d
+    _last_run[kind] = {
+        "run_id": run_id, "created": datetime.now().isoformat(timespec="seconds"),
+        "left": left, "right": right, "left_digests": left_d, "right_digests": right_d, "result": result,
+    }
+    if not HAS_PYARROW or find_snapshot(f"run_{kind}_result", run_id):
+        return
+    # los digests viajan como columna extra para no re-hashear esta corrida en la siguiente
+    left = left.assign(_digest=left_d)
+    right = right.assign(_digest=right_d)
+    save_snapshot(left, f"run_{kind}_left", run_id)
+    save_snapshot(right, f"run_{kind}_right", run_id)
+    save_snapshot(result, f"run_{kind}_result", run_id)  # el último: marca la corrida como completa
+
+@profiled
+def load_last_run(kind: str, exclude_run_id: str = None):
+    """Última corrida guardada de `kind` ("intune" / "ad") distinta de `exclude_run_id`.
+
+    La última de este proceso sale de memoria; el resto (o tras reiniciar la app), de los Parquet.
+    """
+    last = _last_run.get(kind)
+    if last is not None and last["run_id"] != exclude_run_id:
+        return last
+    runs = list_snapshots(f"run_{kind}_result")
+    for row in runs.itertuples():
+        if exclude_run_id and str(row.source_hash) == exclude_run_id:
+            continue
+        left = find_snapshot(f"run_{kind}_left", row.source_hash)
+        right = find_snapshot(f"run_{kind}_right", row.source_hash)
+        if left and right:
+            left = load_snapshot(left)
+            right = load_snapshot(right)
+            return {
+                "run_id": row.source_hash,
+                "created": row.created,
+                "left": left.drop(columns="_digest"),
+                "right": right.drop(columns="_digest"),
+                "left_digests": left["_digest"].to_numpy(dtype=np.uint64),
+                "right_digests": right["_digest"].to_numpy(dtype=np.uint64),
+                "result": load_snapshot(row.path),
+            }
+    return None
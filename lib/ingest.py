@@ -0,0 +1,253 @@
+# lib/ingest.py
+import glob
+import io
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import pandas as pd
+
+from lib.ingest_cache import ingest_cache, file_hash
+from lib.io_utils import CSV_READ_VERSION, read_excel_xlsx, read_csv_smart, read_csv_chunked, use_chunked_csv
+from lib.profiling import profiled, stage as profile_stage, submit_in_context
+from lib.snapshots import HAS_PYARROW, find_snapshot, save_snapshot, snapshot_or_compute, load_snapshot
+
+# Consolas/tenants que se suben en Intune y AD. Agregar una empresa = agregar una tupla aquí.
+TENANTS = [
+    ("pacifico", "Pacífico"),
+    ("prima", "Prima"),
+]
+
+# El parseo de Excel (openpyxl) es Python puro y retiene el GIL: va a un proceso aparte.
+EXCEL_IN_PROCESS = os.environ.get("CMDB_EXCEL_PROCESS", "1") == "1"
+INGEST_THREADS = int(os.environ.get("CMDB_INGEST_THREADS", "8"))
+
+# Uploads desde este tamaño se vuelcan una vez a disco y se parsean desde la ruta (ver spool_upload)
+SPOOL_MIN_MB = int(os.environ.get("CMDB_SPOOL_MIN_MB", "50"))
+SPOOL_DIR = os.environ.get("CMDB_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "cmdb_uploads"))
+SPOOL_KEEP = int(os.environ.get("CMDB_SPOOL_KEEP", "20"))
+# Carpeta compartida del servidor (p.ej. donde deja los exports el job nocturno); vacío = sin carpeta
+INBOX_DIR = os.environ.get("CMDB_INBOX_DIR", "")
+
+_process_pool = None
+_thread_pool = ThreadPoolExecutor(max_workers=INGEST_THREADS, thread_name_prefix="ingest")
+
+class LocalFile(io.BufferedReader):
+    """Archivo en disco con la misma interfaz que el UploadedFile de Streamlit (size, file_id).
+
+    El contenido no se carga en memoria: los lectores usan `path` (CSV memory-mapped, Excel
+    abierto en el proceso hijo) o leen el archivo por bloques.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(io.FileIO(path, "rb"), buffer_size=1 << 20)
+        stat = os.stat(path)
+        self.path = os.path.abspath(path)
+        self.size = stat.st_size
+        self.file_id = f"{self.path}:{stat.st_mtime}"
+
+_spooled = {}  # file_id del upload -> ruta ya volcada (los reruns no vuelven a escribir)
+_spool_lock = threading.Lock()
+
+def spool_upload(uploaded_file):
+    """UploadedFile grande -> LocalFile sobre una copia en SPOOL_DIR, escrita una sola vez por upload.
+
+    Así los lectores ya no copian el upload a nuevos buffers (bytes para el proceso del Excel,
+    una copia por intento de lectura del CSV). Los archivos chicos, None y los que ya están en
+    disco se devuelven tal cual.
+    """
+    if uploaded_file is None or isinstance(uploaded_file, LocalFile):
+        return uploaded_file
+    size = getattr(uploaded_file, "size", None)
+    file_id = getattr(uploaded_file, "file_id", None)
+    if size is None or file_id is None or size < SPOOL_MIN_MB * 1024 * 1024:
+        return uploaded_file
+    with _spool_lock:
+        path = _spooled.get(file_id)
+        if path is None or not os.path.exists(path):
+            os.makedirs(SPOOL_DIR, exist_ok=True)
+            ext = os.path.splitext(getattr(uploaded_file, "name", ""))[1]
+            path = os.path.join(SPOOL_DIR, f"{file_hash(uploaded_file)[:16]}{ext}")
+            if not os.path.exists(path):
+                tmp = path + ".tmp"
+                pos = uploaded_file.tell()
+                uploaded_file.seek(0)
+                with open(tmp, "wb") as fh:
+                    shutil.copyfileobj(uploaded_file, fh, 1 << 20)
+                uploaded_file.seek(pos)
+                os.replace(tmp, path)  # escritura atómica: nunca se lee un volcado a medias
+            _spooled[file_id] = path
+            _prune_spool()
+    return LocalFile(path)
+
+def _prune_spool() -> None:
+    # los LocalFile ya abiertos sobre un volcado borrado siguen leyendo (se borra la entrada, no el inodo)
+    files = sorted(glob.glob(os.path.join(SPOOL_DIR, "*")), key=os.path.getmtime)
+    for old in files[:-SPOOL_KEEP]:
+        if not old.endswith(".tmp"):
+            os.remove(old)
+    gone = [fid for fid, path in _spooled.items() if not os.path.exists(path)]
+    for fid in gone:
+        del _spooled[fid]
+
+def inbox_files(extensions: tuple) -> list:
+    """Archivos de INBOX_DIR con alguna de `extensions`, el más reciente primero."""
+    if not INBOX_DIR or not os.path.isdir(INBOX_DIR):
+        return []
+    files = [os.path.join(INBOX_DIR, f) for f in os.listdir(INBOX_DIR)
+             if f.lower().endswith(extensions) and os.path.isfile(os.path.join(INBOX_DIR, f))]
+    return sorted(files, key=os.path.getmtime, reverse=True)
+
+def load_cmdb(uploaded_file, normalize, stage: str, read: dict = None) -> pd.DataFrame:
+    """CMDB normalizada: caché en memoria -> snapshot Parquet del mismo hash -> Excel.
+
+    El Excel solo se parsea si no hay ni entrada en memoria ni snapshot en disco. `read` son
+    las columnas / filtros de fila para read_excel_xlsx; el frame crudo recortado depende de
+    ellos, así que `stage` debe distinguir cada combinación.
+    """
+    key = file_hash(uploaded_file)
+
+    def _from_excel():
+        raw_key = (key, "raw") if read is None else (key, "raw", stage)
+        raw = ingest_cache.get_or_compute(raw_key, read_excel_xlsx, uploaded_file, **(read or {}))
+        return normalize(raw)
+
+    return ingest_cache.get_or_compute((key, stage), snapshot_or_compute, stage, key, _from_excel)
+
+def load_cmdb_snapshot(path: str) -> pd.DataFrame:
+    return ingest_cache.get_or_compute((path, "snapshot"), load_snapshot, path)
+
+def load_csv_std(uploaded_file, normalize, columns, stage: str):
+    """Lee y normaliza un export CSV (Intune / AD) usando el caché por hash y los snapshots.
+
+    Los archivos grandes van por el modo por bloques (solo columnas estandarizadas en memoria);
+    el resto por read_csv_smart, cacheando también el frame crudo. Devuelve (df_std, read_report).
+    """
+    key = file_hash(uploaded_file)
+    stage = f"{stage}+{CSV_READ_VERSION}"  # snapshots de lectores anteriores (con inferencia de tipos) no se reusan
+
+    def _from_csv():
+        if use_chunked_csv(uploaded_file):
+            return read_csv_chunked(uploaded_file, normalize, columns)
+        raw = ingest_cache.get_or_compute((key, "raw"), read_csv_smart, uploaded_file)
+        std = normalize(raw)
+        std.attrs["read_report"] = raw.attrs.get("read_report")
+        return std
+
+    std = ingest_cache.get_or_compute((key, stage), snapshot_or_compute, stage, key, _from_csv)
+    return std, std.attrs.get("read_report")
+
+# --- Ingesta en paralelo (CMDB + N tenants) ---
+
+def _excel_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # spawn: no heredamos los hilos del servidor de Streamlit en el proceso hijo
+        _process_pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+
+def _excel_job(source, normalize, read: dict = None) -> pd.DataFrame:
+    # corre en el proceso hijo; `source` es la ruta del archivo en disco o sus bytes
+    if isinstance(source, str):
+        with open(source, "rb") as fh:
+            return normalize(read_excel_xlsx(fh, **(read or {})))
+    return normalize(read_excel_xlsx(BytesIO(source), **(read or {})))
+
+def _load_cmdb_pooled(uploaded_file, normalize, stage: str, read: dict = None):
+    """Como load_cmdb, pero el parseo del Excel (si hace falta) corre en otro proceso."""
+    key = file_hash(uploaded_file)
+    df = ingest_cache.get((key, stage))
+    if df is not None:
+        return df, "memoria"
+    path = find_snapshot(stage, key) if HAS_PYARROW else None
+    if path is not None:
+        return load_cmdb(uploaded_file, normalize, stage, read), "snapshot"
+    if not EXCEL_IN_PROCESS:
+        return load_cmdb(uploaded_file, normalize, stage, read), "excel"
+
+    global _process_pool
+    try:
+        # las etapas del proceso hijo no se registran: se mide el bloque completo desde aquí
+        with profile_stage(f"read_excel_xlsx+{stage} (proceso)") as info:
+            # en disco solo viaja la ruta; un upload en memoria se manda como bytes
+            source = getattr(uploaded_file, "path", None) or uploaded_file.getvalue()
+            df = _excel_pool().submit(_excel_job, source, normalize, read).result()
+            info["rows_out"] = len(df)
+    except (BrokenProcessPool, pickle.PicklingError, OSError):
+        _process_pool = None  # el pool quedó inservible: se recrea en la próxima corrida
+        return load_cmdb(uploaded_file, normalize, stage, read), "excel"
+    ingest_cache.put((key, stage), df)
+    if HAS_PYARROW:
+        try:
+            save_snapshot(df, stage, key)
+        except Exception:
+            pass  # sin snapshot, pero con el resultado
+    return df, "excel (proceso)"
+
+def _load_cmdb_source(cmdb_source, normalize, stage: str, read: dict = None):
+    if isinstance(cmdb_source, str):  # ruta de un snapshot elegido en la UI
+        return load_cmdb_snapshot(cmdb_source), "snapshot"
+    return _load_cmdb_pooled(cmdb_source, normalize, stage, read)
+
+def _load_tenant(uploaded_file, normalize, columns, stage: str):
+    std, report = load_csv_std(uploaded_file, normalize, columns, stage)
+    return (std, report), (report or {}).get("strategy", "")
+
+@profiled
+def ingest_sources(cmdb_source, cmdb_normalize, cmdb_stage: str, sources: dict, cmdb_read: dict = None):
+    """Lee y normaliza la CMDB y los CSV de varias fuentes (Intune, AD...) a la vez, una sola vez cada uno.
+
+    `cmdb_source` es el archivo subido o la ruta de un snapshot; `cmdb_read`, las columnas /
+    filtros de lectura del Excel (ver load_cmdb). `sources` es
+    {fuente: (tenant_files, csv_normalize, csv_columns, csv_stage)} con tenant_files = {tenant: archivo}.
+    Devuelve (df_cmdb, {fuente: {tenant: (df_std, read_report)}}, timings) donde timings es un
+    DataFrame con el tiempo por archivo (inicio/fin relativos al lote).
+    """
+    t0 = time.perf_counter()
+
+    def _timed(name, fn, *args):
+        start = time.perf_counter()
+        out, source = fn(*args)
+        end = time.perf_counter()
+        return out, {"archivo": name, "origen": source, "inicio_s": round(start - t0, 3),
+                     "fin_s": round(end - t0, 3), "duracion_s": round(end - start, 3)}
+
+    futures = {("CMDB", None): submit_in_context(_thread_pool, _timed, "CMDB", _load_cmdb_source,
+                                                 cmdb_source, cmdb_normalize, cmdb_stage, cmdb_read)}
+    for src, (tenant_files, csv_normalize, csv_columns, csv_stage) in sources.items():
+        # con una sola fuente el archivo se llama como el tenant (igual que antes)
+        for tenant, f in tenant_files.items():
+            name = tenant if len(sources) == 1 else f"{src}/{tenant}"
+            futures[(src, tenant)] = submit_in_context(_thread_pool, _timed, name, _load_tenant,
+                                                       f, csv_normalize, csv_columns, csv_stage)
+
+    results, timings, rows = {src: {} for src in sources}, [], []
+    for (src, tenant), fut in futures.items():
+        out, timing = fut.result()
+        if src == "CMDB":
+            df_cmdb = out
+            rows.append(len(out))
+        else:
+            results[src][tenant] = out
+            rows.append(len(out[0]))
+        timings.append(timing)
+
+    timings = pd.DataFrame(timings).assign(filas=rows)
+    timings.attrs["wall_s"] = round(time.perf_counter() - t0, 3)
+    return df_cmdb, results, timings
+
+def ingest_parallel(cmdb_source, cmdb_normalize, cmdb_stage: str,
+                    tenant_files: dict, csv_normalize, csv_columns, csv_stage: str, cmdb_read: dict = None):
+    """ingest_sources con una sola fuente: devuelve (df_cmdb, {tenant: (df_std, read_report)}, timings)."""
+    df_cmdb, results, timings = ingest_sources(
+        cmdb_source, cmdb_normalize, cmdb_stage,
+        {"csv": (tenant_files, csv_normalize, csv_columns, csv_stage)}, cmdb_read,
+    )
+    return df_cmdb, results["csv"], timings
@@ -0,0 +1,127 @@
+# lib/ingest_cache.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Límite de memoria del caché compartido (MB). Configurable por variable de entorno.
+CACHE_MAX_MB = int(os.environ.get("CMDB_CACHE_MAX_MB", "1024"))
+
+_hash_memo = OrderedDict()
+_hash_lock = threading.Lock()  # file_hash se llama desde los workers de ingest_parallel
+
+def file_hash(uploaded_file) -> str:
+    """Hash SHA-256 del contenido del archivo subido (no depende del nombre)."""
+    # Streamlit asigna un file_id estable por archivo subido: evitamos re-hashear en cada rerun
+    memo_key = (getattr(uploaded_file, "file_id", None), getattr(uploaded_file, "size", None))
+    if memo_key[0] is not None:
+        with _hash_lock:
+            if memo_key in _hash_memo:
+                _hash_memo.move_to_end(memo_key)
+                return _hash_memo[memo_key]
+
+    pos = uploaded_file.tell()
+    uploaded_file.seek(0)
+    h = hashlib.sha256()
+    for block in iter(lambda: uploaded_file.read(1 << 20), b""):
+        h.update(block)
+    uploaded_file.seek(pos)
+    digest = h.hexdigest()
+
+    if memo_key[0] is not None:
+        with _hash_lock:
+            _hash_memo[memo_key] = digest
+            while len(_hash_memo) > 256:
+                _hash_memo.popitem(last=False)
+    return digest
+
+def frame_hash(df: pd.DataFrame) -> str:
+    """Hash SHA-256 del contenido de un DataFrame (columnas + valores, sin índice)."""
+    h = hashlib.sha256(",".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False, categorize=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _sizeof(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_sizeof(v) for v in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(_sizeof(v) for v in value)
+    return 1024
+
+class IngestCache:
+    """Caché LRU en memoria, compartido por todas las páginas y reruns del proceso.
+
+    Las claves son tuplas (hash_de_archivo, etapa, ...). Los valores devueltos se
+    comparten entre sesiones: quien los use no debe modificarlos in-place.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._sizes = {}
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+
+    def put(self, key, value) -> None:
+        size = _sizeof(value)
+        with self._lock:
+            if key in self._items:
+                self._total -= self._sizes.pop(key)
+                del self._items[key]
+            if size > self.max_bytes:
+                # no cabe ni solo: no se cachea
+                return
+            self._items[key] = value
+            self._sizes[key] = size
+            self._total += size
+            while self._total > self.max_bytes:
+                old_key, _ = self._items.popitem(last=False)
+                self._total -= self._sizes.pop(old_key)
+
+    def get_or_compute(self, key, fn, *args, **kwargs):
+        value = self.get(key)
+        if value is None:
+            value = fn(*args, **kwargs)
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self._total = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+# Instancia única por proceso: los módulos de lib/ no se re-ejecutan en cada rerun de Streamlit.
+ingest_cache = IngestCache(CACHE_MAX_MB * 1024 * 1024)
@@ -1,24 +1,179 @@
 # lib/io_utils.py
+import codecs
+import csv
+import os
+import time
 import pandas as pd
 from io import BytesIO
 
-def read_excel_xlsx(uploaded_file) -> pd.DataFrame:
-    return pd.read_excel(uploaded_file)
+from lib.dtypes import clean_str
+from lib.profiling import profiled
+from lib.xlsx_stream import XlsxLayoutError, read_xlsx_columns
 
-def read_csv_smart(uploaded_file) -> pd.DataFrame:
+try:
+    import pyarrow  # noqa: F401  (viene con streamlit)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
 
-    raw = uploaded_file.read() 
+SNIFF_BYTES = 64 * 1024
+CSV_DELIMITERS = "\t;,|"
+
+# Modo por bloques: a partir de este tamaño los CSV se leen y normalizan por chunks
+CSV_CHUNKED_MIN_MB = int(os.environ.get("CMDB_CSV_CHUNKED_MIN_MB", "50"))
+CSV_CHUNK_ROWS = int(os.environ.get("CMDB_CSV_CHUNK_ROWS", "200000"))
+# Todas las lecturas de CSV (rápida, respaldo y por bloques) leen texto: sin inferencia una serie
+# "00123" sigue siendo "00123" y el mismo archivo normaliza igual por cualquier camino
+CSV_DTYPE = str
+# va en la etapa de los snapshots de CSV: cambia si cambia lo que devuelven los lectores
+CSV_READ_VERSION = "txt"
+# filas que se pasan a object por vez al escribir un xlsx
+XLSX_CHUNK_ROWS = 10_000
+
+def _select_columns(df: pd.DataFrame, columns: list, row_filter: dict = None) -> pd.DataFrame:
+    """Mismo recorte que read_xlsx_columns sobre un frame ya leído completo."""
+    if any(c not in df.columns for c in columns):
+        return df  # el normalizador informa las columnas que faltan
+    source_columns = [str(c) for c in df.columns]
+    df = df[columns]
+    for c, values in (row_filter or {}).items():
+        df = df[clean_str(df[c], lower=True).isin(list(values)).to_numpy(dtype=bool)]
+    df.attrs["source_columns"] = source_columns
+    return df
+
+@profiled
+def read_excel_xlsx(uploaded_file, columns: list = None, row_filter: dict = None) -> pd.DataFrame:
+    """Primera hoja del Excel.
+
+    Con `columns` solo se materializan esas columnas: primero se lee la cabecera y, si falta
+    alguna, se devuelve un frame vacío con la cabecera detectada para que el normalizador
+    informe el error sin recorrer las filas. `row_filter` ({columna: valores en minúsculas})
+    descarta filas mientras se leen. La cabecera completa queda en attrs["source_columns"].
+    """
+    if columns is None:
+        return pd.read_excel(uploaded_file)
+    uploaded_file.seek(0)
+    try:
+        header, rows = read_xlsx_columns(uploaded_file, columns, row_filter)
+    except XlsxLayoutError:
+        # .xls, hojas con prefijos de namespace, celdas sin referencia...: lectura completa
+        uploaded_file.seek(0)
+        return _select_columns(pd.read_excel(uploaded_file), columns, row_filter)
+    if rows is None:
+        return pd.DataFrame(columns=header)
+    df = pd.DataFrame(rows, columns=columns)
+    df.attrs["source_columns"] = header
+    return df
+
+def detect_encoding(sample: bytes) -> str:
+    # 1) BOM
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample[:2] in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+        return "utf-16"
+    # 2) UTF-16 sin BOM: la mitad de los bytes son nulos
+    if sample and sample.count(b"\x00") > len(sample) // 4:
+        return "utf-16le" if sample[1::2].count(0) > sample[0::2].count(0) else "utf-16be"
+    # 3) UTF-8 estricto sobre la muestra (tolerando un carácter cortado al final)
+    try:
+        sample.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        if e.reason == "unexpected end of data" and e.start >= len(sample) - 3:
+            return "utf-8"
+    return "cp1252"
+
+def detect_delimiter(text: str) -> str:
+    lines = [ln for ln in text.splitlines()[:50] if ln.strip()]
+    if len(lines) > 1:
+        lines = lines[:-1]  # la última línea de la muestra puede venir cortada
+    sample = "\n".join(lines)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        pass
+    # respaldo: el delimitador más frecuente en la cabecera
+    header = lines[0] if lines else ""
+    counts = {d: header.count(d) for d in CSV_DELIMITERS}
+    best = max(counts, key=counts.get)
+    return best if counts[best] else ","
+
+def _csv_input(uploaded_file):
+    """Lo que recibe pd.read_csv: la ruta si el archivo está en disco (LocalFile), si no el
+    propio archivo rebobinado. Así cada intento lee el original en vez de otra copia de los bytes."""
+    path = getattr(uploaded_file, "path", None)
+    if path is not None:
+        return path
+    uploaded_file.seek(0)
+    return uploaded_file
+
+def _read_csv(uploaded_file, **kwargs):
+    src = _csv_input(uploaded_file)
+    if isinstance(src, str) and kwargs.get("engine") == "c":
+        kwargs["memory_map"] = True  # el motor C parsea sobre el archivo mapeado, sin leerlo a un buffer
+    return pd.read_csv(src, **kwargs)
+
+def _head(uploaded_file, n: int = SNIFF_BYTES) -> bytes:
+    uploaded_file.seek(0)
+    sample = uploaded_file.read(n)
+    uploaded_file.seek(0)
+    return sample
+
+def _read_csv_fast(uploaded_file, sample: bytes, report: dict) -> pd.DataFrame:
+    enc = detect_encoding(sample)
+    text = sample.decode("utf-16" if enc == "utf-16" else enc, errors="ignore")
+    sep = detect_delimiter(text.lstrip("\ufeff"))
+
+    # pyarrow solo con UTF-8; el motor C cubre el resto de encodings
+    engine = "pyarrow" if HAS_PYARROW and enc in ("utf-8", "utf-8-sig") else "c"
+    report.update({"encoding": enc, "sep": sep, "engine": engine})
+    df = _read_csv(uploaded_file, encoding=enc, sep=sep, engine=engine, dtype=CSV_DTYPE)
+    if df.shape[1] < 2:
+        raise ValueError(f"una sola columna con sep={sep!r}")
+    return df
+
+def format_read_report(report: dict) -> str:
+    if not report:
+        return ""
+    return (f"estrategia={report.get('strategy')} · encoding={report.get('encoding')} · "
+            f"sep={report.get('sep')!r} · motor={report.get('engine')} · "
+            f"intentos={report.get('attempts')} · {report.get('seconds', 0):.2f}s")
+
+@profiled
+def read_csv_smart(uploaded_file, report: dict = None) -> pd.DataFrame:
+    """Lee un CSV detectando encoding (BOM + muestra) y separador (sniffing) en una pasada.
+
+    Si la detección falla se vuelve al barrido de encodings/separadores con engine="python".
+    `report` (opcional) se completa con la estrategia ganadora y el tiempo; también queda
+    en `df.attrs["read_report"]`. Los archivos en disco (LocalFile) se parsean desde su ruta.
+    Todas las columnas se leen como texto (CSV_DTYPE), igual que en read_csv_chunked.
+    """
+    report = {} if report is None else report
+    t0 = time.perf_counter()
+    sample = _head(uploaded_file)
     tried = []
 
+    try:
+        df = _read_csv_fast(uploaded_file, sample, report)
+        report.update({"strategy": "fast", "attempts": 1, "seconds": time.perf_counter() - t0})
+        df.attrs["read_report"] = dict(report)
+        return df
+    except Exception as e:
+        tried.append(f"fast {report.get('encoding')} / sep={report.get('sep')!r} -> {e}")
+
     def _try(enc, sep=None):
         try:
-            return pd.read_csv(BytesIO(raw), encoding=enc, sep=sep, engine="python")
+            df = _read_csv(uploaded_file, encoding=enc, sep=sep, engine="python", dtype=CSV_DTYPE)
         except Exception as e:
             tried.append(f"{enc} / sep={repr(sep)} -> {e}")
             return None
+        report.update({"strategy": "fallback", "encoding": enc, "sep": sep, "engine": "python",
+                       "attempts": len(tried) + 1, "seconds": time.perf_counter() - t0})
+        df.attrs["read_report"] = dict(report)
+        return df
 
     # Caso típico AD: UTF-16 con BOM
-    if raw[:2] in (b"\xff\xfe", b"\xfe\xff"):
+    if sample[:2] in (b"\xff\xfe", b"\xfe\xff"):
         for sep in (None, "\t", ";", ","):
             df = _try("utf-16", sep)
             if df is not None:
@@ -46,8 +201,108 @@ def read_csv_smart(uploaded_file) -> pd.DataFrame:
         f"Últimos intentos:\n{detail}"
     )
 
-def download_excel(df: pd.DataFrame, sheet_name: str, filename: str) -> bytes:
+def _read_csv_chunked_fallback(uploaded_file, normalize, report: dict, t0: float, error) -> pd.DataFrame:
+    uploaded_file.seek(0)
+    df = normalize(read_csv_smart(uploaded_file, report))
+    report["detail"] = f"chunked -> {error}"
+    report["seconds"] = time.perf_counter() - t0
+    df.attrs["read_report"] = dict(report)
+    return df
+
+def use_chunked_csv(uploaded_file) -> bool:
+    size = getattr(uploaded_file, "size", None)
+    return size is not None and size >= CSV_CHUNKED_MIN_MB * 1024 * 1024
+
+@profiled
+def read_csv_chunked(uploaded_file, normalize, columns, chunksize: int = CSV_CHUNK_ROWS,
+                     report: dict = None) -> pd.DataFrame:
+    """Lee el CSV por bloques y pasa cada bloque por `normalize` (normalize_intune / normalize_ad).
+
+    Solo se materializan `columns` del archivo y solo se acumulan las columnas estandarizadas,
+    así el pico de memoria depende de `chunksize` y no del tamaño del archivo. Si la detección
+    de encoding/separador no sirve, cae a read_csv_smart + normalize.
+    """
+    report = {} if report is None else report
+    t0 = time.perf_counter()
+    sample = _head(uploaded_file)
+    enc = detect_encoding(sample)
+    sep = detect_delimiter(sample.decode("utf-16" if enc == "utf-16" else enc, errors="ignore").lstrip("\ufeff"))
+    report.update({"encoding": enc, "sep": sep, "engine": "c", "chunksize": chunksize})
+
+    try:
+        header = _read_csv(uploaded_file, encoding=enc, sep=sep, nrows=0).columns
+        if len(header) < 2:
+            raise ValueError(f"una sola columna con sep={sep!r}")
+    except ValueError as e:  # incluye UnicodeDecodeError y ParserError
+        return _read_csv_chunked_fallback(uploaded_file, normalize, report, t0, e)
+
+    if any(c not in header for c in columns):
+        # que normalize levante su propio error de columnas faltantes
+        return normalize(pd.DataFrame(columns=header))
+
+    try:
+        # CSV_DTYPE (texto), como read_csv_smart: además la inferencia por bloque daría tipos distintos entre chunks
+        reader = _read_csv(uploaded_file, encoding=enc, sep=sep, usecols=columns, dtype=CSV_DTYPE,
+                           chunksize=chunksize, engine="c")
+        parts = [normalize(chunk) for chunk in reader]
+    except (UnicodeDecodeError, pd.errors.ParserError) as e:
+        return _read_csv_chunked_fallback(uploaded_file, normalize, report, t0, e)
+
+    df = pd.concat(parts, ignore_index=True) if parts else normalize(pd.DataFrame(columns=columns))
+    report.update({"strategy": "chunked", "attempts": 1, "chunks": len(parts)})
+    report["seconds"] = time.perf_counter() - t0
+    df.attrs["read_report"] = dict(report)
+    return df
+
+EXPORT_FORMATS = {
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+def _xlsx_rows(df: pd.DataFrame):
+    # object + None: tipos Python nativos y celdas vacías en vez de NaN; por bloques de
+    # XLSX_CHUNK_ROWS para no tener una copia object del frame entero en memoria
+    yield [str(c) for c in df.columns]
+    for start in range(0, len(df), XLSX_CHUNK_ROWS):
+        chunk = df.iloc[start:start + XLSX_CHUNK_ROWS]
+        yield from chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+
+def _write_xlsx(df: pd.DataFrame, sheet_name: str) -> bytes:
     output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
+    try:
+        import xlsxwriter
+    except ImportError:
+        xlsxwriter = None
+
+    if xlsxwriter is not None:
+        # constant_memory: xlsxwriter vuelca cada fila al disco temporal al pasar a la siguiente
+        wb = xlsxwriter.Workbook(output, {"constant_memory": True, "in_memory": False})
+        ws = wb.add_worksheet(sheet_name[:31])
+        for i, row in enumerate(_xlsx_rows(df)):
+            ws.write_row(i, 0, row)
+        wb.close()
+    else:
+        from openpyxl import Workbook
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(sheet_name[:31])
+        for row in _xlsx_rows(df):
+            ws.append(row)
+        wb.save(output)
     return output.getvalue()
+
+@profiled
+def export_bytes(df: pd.DataFrame, fmt: str, sheet_name: str = "Alertas") -> bytes:
+    """Serializa un reporte a xlsx (escritura en streaming), csv o parquet."""
+    if fmt == "xlsx":
+        return _write_xlsx(df, sheet_name)
+    if fmt == "csv":
+        return df.to_csv(index=False).encode("utf-8-sig")  # BOM: Excel abre bien los acentos
+    if fmt == "parquet":
+        output = BytesIO()
+        df.to_parquet(output, index=False)
+        return output.getvalue()
+    raise ValueError(f"Formato de exportación no soportado: {fmt}")
+
+def download_excel(df: pd.DataFrame, sheet_name: str, filename: str) -> bytes:
+    return export_bytes(df, "xlsx", sheet_name)
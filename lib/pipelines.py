@@ -0,0 +1,211 @@
+# lib/pipelines.py
+# Motor compartido por la app de Streamlit y el CLI (cli.py): sin dependencias de UI.
+import pandas as pd
+
+from lib.cmdb_utils import CMDB_READ, DIST_VALUES, normalize_cmdb, cmdb_std_cols
+from lib.compare_ad import AD_REQUIRED, normalize_ad, compare_cmdb_ad
+from lib.compare_intune import INTUNE_REQUIRED, normalize_intune, compare_cmdb_intune
+from lib.dtypes import clean_str
+from lib.incremental import (compare_cmdb_ad_incremental, compare_cmdb_intune_incremental,
+                             load_last_run, run_hash, save_run)
+from lib.ingest import ingest_parallel, ingest_sources, load_cmdb
+from lib.ingest_cache import ingest_cache, file_hash
+from lib.profiling import profiled
+from lib.reconcile import reconcile_devices, reconcile_summary
+from lib.serial_match import propose_serial_matches
+from lib.tenant_index import TenantIndex
+from lib.validations import apply_validations
+
+REQUIRED_COLS = [
+    "Número de serie",
+    "Hostname",
+    "Tipo",
+    "Correo Electrónico",
+    "Clasificación Distribución",
+]
+# pocos valores muy repetidos: códigos enteros + un diccionario en vez de un str por fila
+CATEGORY_COLS = ["Tipo", "Clasificación Distribución"]
+TIPO_VALUES = ["notebook", "desktop"]
+# Lectura del Excel de QA: solo las columnas requeridas, todas las filas (cacheada y en snapshot
+# una vez por archivo; cambiar un filtro del sidebar no vuelve a leer el Excel)
+QA_STAGE = "normalize_df"
+QA_READ = {"columns": REQUIRED_COLS}
+
+# Config por defecto: valores iniciales del sidebar de app.py y config del CLI sin --config
+DEFAULT_CFG = {
+    "filters": {"dist": True, "tipo": True},
+    "params": {"minlen_serie": 7, "minlen_host": 7, "allowed_domains": ["@pacifico", "@prima"]},
+    "rules": {
+        "serie": {"vacio": True, "espacios": True, "minlen": True},
+        "host":  {"vacio": True, "espacios": True, "minlen": True},
+        "mail":  {"vacio": True, "espacios": True, "dominio": True},
+        "dups":  {"serie": True, "host": True, "mail": True},
+    },
+}
+
+# --- QA de inventario ---
+
+@profiled
+def normalize_df(df: pd.DataFrame) -> pd.DataFrame:
+    missing = [c for c in REQUIRED_COLS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Faltan columnas requeridas: {missing}. Columnas detectadas: {df.columns.tolist()}")
+
+    # con lectura por columnas, la cabecera completa del Excel viene en attrs
+    source_columns = df.attrs.get("source_columns") or [str(c) for c in df.columns]
+    df = pd.DataFrame({c: clean_str(df[c]) for c in REQUIRED_COLS})
+    for c in CATEGORY_COLS:
+        df[c] = df[c].astype("category")
+    df.attrs["source_columns"] = source_columns  # viaja también en el snapshot Parquet
+    return df
+
+@profiled
+def apply_filters(df: pd.DataFrame, cfg) -> pd.DataFrame:
+    f = cfg["filters"]
+    if f["dist"]:
+        df = df[df["Clasificación Distribución"].str.lower().isin(DIST_VALUES)]
+    if f["tipo"]:
+        df = df[df["Tipo"].str.lower().isin(TIPO_VALUES)]
+    return df
+
+def load_qa_cmdb(uploaded_file) -> pd.DataFrame:
+    # caché en memoria -> snapshot Parquet del mismo archivo -> Excel (solo REQUIRED_COLS).
+    # Sin filtros de fila: una sola lectura por archivo; los filtros del sidebar van en run_qa
+    return load_cmdb(uploaded_file, normalize_df, QA_STAGE, QA_READ)
+
+def qa_key(uploaded_file, cfg) -> tuple:
+    """Identidad de la CMDB de QA ya filtrada (hash del archivo + filtros): clave de run_qa."""
+    f = cfg["filters"]
+    return (file_hash(uploaded_file), "+".join([QA_STAGE] + [k for k in ("dist", "tipo") if f.get(k)]))
+
+def run_qa(df: pd.DataFrame, cfg, key: tuple = None):
+    """Filtros + reglas sobre la CMDB normalizada. Devuelve (df_validado, df_alertas).
+
+    Con `key` (qa_key) el frame filtrado y la máscara de cada regla se cachean: en la app,
+    cambiar una regla o un parámetro del sidebar solo recalcula esa máscara.
+    """
+    if key is None:
+        df = apply_filters(df, cfg)
+    else:
+        df = ingest_cache.get_or_compute((*key, "apply_filters"), apply_filters, df, cfg)
+    if df.empty:
+        return df.assign(Alertas=""), df.assign(Alertas="")
+    df_validado = apply_validations(df, cfg, key)
+    return df_validado, df_validado[df_validado["Alertas"] != ""]
+
+# --- Conciliaciones CMDB vs Intune / AD ---
+
+def combine_tenants(tenant_std: dict, key: str, conflict_cols: list):
+    """Une los tenants por `key` (si está en varios manda el primero, con `origen` y `origenes`).
+
+    Devuelve (combinado, conflictos): las claves presentes en más de un tenant cuyos
+    `conflict_cols` no coinciden (p.ej. cuenta habilitada en un tenant y deshabilitada en otro).
+    """
+    index = TenantIndex(tenant_std, key)
+    return index.merged(), index.conflicts(conflict_cols)
+
+def cmdb_emails(df_cmdb: pd.DataFrame) -> pd.DataFrame:
+    if "Correo Electrónico" not in df_cmdb.columns:
+        raise ValueError("La CMDB no tiene la columna 'Correo Electrónico'")
+    return (
+        df_cmdb[["Correo Electrónico"]]
+        .rename(columns={"Correo Electrónico": "email"})
+        .assign(email=lambda s: clean_str(s["email"], lower=True))
+        .drop_duplicates()
+    )
+
+def _compare_incremental(kind: str, compare_incremental, left: pd.DataFrame, right: pd.DataFrame) -> dict:
+    run_id = run_hash(left, right)
+    prev_run = load_last_run(kind, exclude_run_id=run_id)
+    result, delta, inc_stats = compare_incremental(prev_run, left, right)
+    save_run(kind, run_id, left, right, result, inc_stats)
+    return {"result": result, "delta": delta, "inc_stats": inc_stats,
+            "prev_created": prev_run and prev_run["created"]}
+
+def _compare(kind: str, compare, compare_incremental, left: pd.DataFrame, right: pd.DataFrame,
+             incremental: bool, inputs_key: tuple) -> dict:
+    out = {"delta": None, "inc_stats": None, "prev_created": None}
+    if incremental:
+        # mismos archivos que en el rerun anterior: ni hash de la corrida, ni diff, ni Parquet
+        out.update(ingest_cache.get_or_compute((*inputs_key, kind, "incremental"), _compare_incremental,
+                                               kind, compare_incremental, left, right))
+    else:
+        out["result"] = compare(left, right)
+    out["alerts"] = out["result"][out["result"]["Alertas"] != ""].copy()
+    return out
+
+def _inputs_key(cmdb_source, tenant_files: dict) -> tuple:
+    """Identidad de los archivos de entrada: hash (o ruta del snapshot) de la CMDB y de cada tenant."""
+    cmdb_key = cmdb_source if isinstance(cmdb_source, str) else file_hash(cmdb_source)
+    return (cmdb_key, *sorted((t, file_hash(f)) for t, f in tenant_files.items()))
+
+def run_intune(cmdb_source, tenant_files: dict, incremental: bool = False) -> dict:
+    """CMDB vs Intune de N tenants.
+
+    `cmdb_source` es un archivo (subido o local) o la ruta de un snapshot. Devuelve un dict con
+    los frames intermedios (left/right), los conflictos entre tenants (conflicts), timings de
+    lectura, el resultado (result/alerts/delta) y las propuestas de match para las series sin
+    cruce exacto (matches).
+    """
+    # leer y normalizar todos los archivos en paralelo
+    # (caché por hash -> snapshot Parquet -> parseo; el Excel va en un proceso aparte
+    #  y los CSV grandes se leen por bloques)
+    df_cmdb, tenant_std, timings = ingest_parallel(
+        cmdb_source, normalize_cmdb, "normalize_cmdb",  # filtra Distribuido(s) y normaliza
+        tenant_files, normalize_intune, INTUNE_REQUIRED, "normalize_intune",  # -> serial, email, hostname
+        cmdb_read=CMDB_READ,  # del Excel solo las columnas requeridas y las filas Distribuido(s)
+    )
+    inputs_key = _inputs_key(cmdb_source, tenant_files)
+    left = ingest_cache.get_or_compute((inputs_key[0], "cmdb_std_cols"), cmdb_std_cols, df_cmdb)  # -> serial, email, hostname
+    right, conflicts = combine_tenants(tenant_std, "serial", ["email", "hostname"])
+
+    out = {"left": left, "right": right, "conflicts": conflicts, "tenant_std": tenant_std, "timings": timings}
+    out.update(_compare("intune", compare_cmdb_intune, compare_cmdb_intune_incremental, left, right,
+                        incremental, inputs_key))
+    # "Serie no existe en Intune" que en realidad es formato (ceros, guiones, S/N...) o un typo
+    # depende solo de los archivos: los reruns de la página (paginación, búsqueda, exports) no la recalculan
+    out["matches"] = ingest_cache.get_or_compute((*inputs_key, "serial_matches"), propose_serial_matches,
+                                                 out["result"], right)
+    return out
+
+def run_ad(cmdb_source, tenant_files: dict, incremental: bool = False) -> dict:
+    """CMDB vs Active Directory de N tenants (mismo contrato que run_intune)."""
+    df_cmdb, tenant_std, timings = ingest_parallel(
+        cmdb_source, normalize_cmdb, "normalize_cmdb",  # ya filtra Distribuido(s)
+        tenant_files, normalize_ad, AD_REQUIRED, "normalize_ad",  # -> email, enabled
+        cmdb_read=CMDB_READ,
+    )
+    left = cmdb_emails(df_cmdb)
+    right, conflicts = combine_tenants(tenant_std, "email", ["enabled"])
+
+    out = {"left": left, "right": right, "conflicts": conflicts, "tenant_std": tenant_std, "timings": timings}
+    out.update(_compare("ad", compare_cmdb_ad, compare_cmdb_ad_incremental, left, right,
+                        incremental, _inputs_key(cmdb_source, tenant_files)))
+    return out
+
+def run_reconcile(cmdb_source, intune_files: dict, ad_files: dict) -> dict:
+    """CMDB vs Intune vs AD en una pasada: la CMDB se lee y normaliza una sola vez.
+
+    Devuelve un dict con el reporte por equipo (report), sus alertas, el resumen, los frames
+    combinados de cada fuente, sus conflictos entre tenants ({"intune", "ad"}) y los timings de lectura.
+    """
+    df_cmdb, std, timings = ingest_sources(
+        cmdb_source, normalize_cmdb, "normalize_cmdb",
+        {
+            "intune": (intune_files, normalize_intune, INTUNE_REQUIRED, "normalize_intune"),
+            "ad": (ad_files, normalize_ad, AD_REQUIRED, "normalize_ad"),
+        },
+        cmdb_read=CMDB_READ,
+    )
+    cmdb_key = cmdb_source if isinstance(cmdb_source, str) else file_hash(cmdb_source)
+    left = ingest_cache.get_or_compute((cmdb_key, "cmdb_std_cols"), cmdb_std_cols, df_cmdb)
+    intune, intune_conflicts = combine_tenants(std["intune"], "serial", ["email", "hostname"])
+    ad, ad_conflicts = combine_tenants(std["ad"], "email", ["enabled"])
+
+    report = reconcile_devices(left, intune, ad)
+    return {
+        "left": left, "intune": intune, "ad": ad, "tenant_std": std, "timings": timings,
+        "conflicts": {"intune": intune_conflicts, "ad": ad_conflicts},
+        "report": report, "alerts": report[report["Alertas"] != ""].copy(),
+        "summary": reconcile_summary(report),
+    }
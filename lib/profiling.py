@@ -0,0 +1,154 @@
+# lib/profiling.py
+import contextvars
+import functools
+import json
+import os
+import platform
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import resource  # no existe en Windows
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+    _PROC = psutil.Process()
+except ImportError:
+    _PROC = None
+
+# Colector de la corrida actual (una por rerun de Streamlit / ejecución del CLI).
+# contextvars: cada sesión de Streamlit corre en su propio hilo y no mezcla registros.
+_run = contextvars.ContextVar("cmdb_profile_run", default=None)
+_depth = contextvars.ContextVar("cmdb_profile_depth", default=0)
+
+def _rss_mb():
+    """RSS actual del proceso (psutil o /proc); None si no hay cómo medirlo."""
+    if _PROC is not None:
+        return _PROC.memory_info().rss / 2**20
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _peak_rss_mb():
+    """Pico de RSS del proceso desde que arrancó (ru_maxrss / peak_wset en Windows)."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if platform.system() == "Darwin" else peak / 1024  # bytes en macOS, KB en Linux
+    if _PROC is not None:
+        return getattr(_PROC.memory_info(), "peak_wset", 0) / 2**20 or None
+    return None
+
+def _rows(obj):
+    if isinstance(obj, tuple) and obj:
+        obj = obj[0]  # p.ej. (df_std, read_report)
+    return len(obj) if isinstance(obj, pd.DataFrame) else None
+
+class ProfileRun:
+    """Registros de las etapas de una corrida."""
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.created = datetime.now().isoformat(timespec="seconds")
+        self.t0 = time.perf_counter()
+        self.records = []
+        self._lock = threading.Lock()
+
+    def add(self, rec: dict) -> None:
+        with self._lock:  # las etapas de ingest_parallel registran desde varios hilos
+            self.records.append(rec)
+
+    def to_frame(self) -> pd.DataFrame:
+        cols = ["etapa", "nivel", "inicio_s", "duracion_s", "filas_in", "filas_out",
+                "rss_mb", "pico_rss_mb", "delta_pico_mb", "hilo", "error"]
+        df = pd.DataFrame(sorted(self.records, key=lambda r: r["inicio_s"]), columns=cols)
+        return df.astype({"filas_in": "Int64", "filas_out": "Int64"})
+
+    def to_json(self) -> bytes:
+        return json.dumps({
+            "run": self.name,
+            "created": self.created,
+            "total_s": round(time.perf_counter() - self.t0, 4),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "stages": self.to_frame().astype(object).where(lambda d: d.notna(), None).to_dict("records"),
+        }, indent=2, ensure_ascii=False).encode("utf-8")
+
+def start_run(name: str = "") -> ProfileRun:
+    """Abre una corrida nueva en el contexto actual y la devuelve."""
+    run = ProfileRun(name)
+    _run.set(run)
+    _depth.set(0)
+    return run
+
+@contextmanager
+def profile_run(name: str = ""):
+    token = _run.set(ProfileRun(name))
+    try:
+        yield _run.get()
+    finally:
+        _run.reset(token)
+
+@contextmanager
+def stage(name: str, rows_in=None):
+    """Mide un bloque: tiempo, filas y memoria. Sin corrida abierta no hace nada.
+
+    El dict que se entrega permite fijar `rows_out` desde dentro del bloque.
+    """
+    run = _run.get()
+    if run is None:
+        yield {}
+        return
+    info = {"rows_out": None}
+    depth = _depth.get()
+    token = _depth.set(depth + 1)
+    peak0 = _peak_rss_mb()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield info
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        end = time.perf_counter()
+        _depth.reset(token)
+        peak = _peak_rss_mb()
+        rss = _rss_mb()
+        run.add({
+            "etapa": name,
+            "nivel": depth,
+            "inicio_s": round(start - run.t0, 4),
+            "duracion_s": round(end - start, 4),
+            "filas_in": rows_in,
+            "filas_out": info["rows_out"],
+            "rss_mb": None if rss is None else round(rss, 1),
+            "pico_rss_mb": None if peak is None else round(peak, 1),
+            "delta_pico_mb": None if peak is None else round(peak - peak0, 1),
+            "hilo": threading.current_thread().name,
+            "error": error,
+        })
+
+def profiled(fn):
+    """Decorador: registra la llamada como etapa (filas del primer DataFrame de entrada y de la salida)."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _run.get() is None:
+            return fn(*args, **kwargs)
+        rows_in = next((len(a) for a in args if isinstance(a, pd.DataFrame)), None)
+        with stage(fn.__name__, rows_in) as info:
+            out = fn(*args, **kwargs)
+            info["rows_out"] = _rows(out)
+        return out
+    return wrapper
+
+def submit_in_context(executor, fn, *args):
+    """executor.submit que conserva la corrida actual en el hilo trabajador."""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
@@ -0,0 +1,76 @@
+# lib/reconcile.py
+# Conciliación CMDB vs Intune vs AD en una sola pasada: la CMDB se lee y normaliza una vez y
+# cada fuente se cruza con un índice hash sobre su clave (Intune por serie, AD por correo).
+# Agregar una fuente = un lookup más: el costo crece lineal con el número de fuentes.
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+from lib.compare_ad import AD_ALERTS, ad_alert_codes
+from lib.compare_intune import INTUNE_ALERTS, intune_alert_codes
+from lib.dtypes import STR_DTYPE
+from lib.profiling import profiled, stage
+
+# combinación (alerta Intune, alerta AD); código = código_intune * len(AD_ALERTS) + código_ad
+RECONCILE_ALERTS = ["; ".join(a for a in (i, d) if a) for i in INTUNE_ALERTS for d in AD_ALERTS]
+
+def _lookup(keys: pd.Series, source: pd.DataFrame, key: str, name: str):
+    """(fuente sin claves repetidas, posición de cada clave en ella o -1) vía índice hash."""
+    src = source.drop_duplicates(subset=[key], keep="first").reset_index(drop=True)
+    with stage(f"reconcile_devices.{name}", len(keys)) as info:
+        pos = pd.Index(src[key].astype(STR_DTYPE)).get_indexer(keys)
+        info["rows_out"] = int((pos >= 0).sum())
+    return src, pos
+
+def _at(src: pd.DataFrame, col: str, pos: np.ndarray):
+    """Valores de `col` en las posiciones `pos`; <NA> donde la clave no estaba (-1)."""
+    return take(src[col].array, pos, allow_fill=True)
+
+@profiled
+def reconcile_devices(cmdb_std: pd.DataFrame, intune_std: pd.DataFrame, ad_std: pd.DataFrame) -> pd.DataFrame:
+    """Reporte por equipo de la CMDB: presencia en Intune (serie), usuario en AD (correo) y diferencias.
+
+    `cmdb_std` = serial/email/hostname (cmdb_std_cols); `intune_std` y `ad_std` son los frames
+    combinados de los tenants. Las columnas de alertas usan las mismas reglas que
+    compare_cmdb_intune y compare_cmdb_ad.
+    """
+    cm = cmdb_std[["serial", "email", "hostname"]].astype(STR_DTYPE).reset_index(drop=True)
+    cm["email"] = cm["email"].str.lower()
+    cm["hostname"] = cm["hostname"].str.lower()
+
+    intune, it_pos = _lookup(cm["serial"], intune_std.astype({c: STR_DTYPE for c in ("serial", "email", "hostname")}),
+                             "serial", "intune")
+    ad, ad_pos = _lookup(cm["email"], ad_std.astype({"email": STR_DTYPE, "enabled": "boolean"}), "email", "ad")
+
+    out = pd.DataFrame({
+        "serial": cm["serial"],
+        "hostname_cmdb": cm["hostname"],
+        "email_cmdb": cm["email"],
+        "en_intune": it_pos >= 0,
+        "hostname_intune": _at(intune, "hostname", it_pos),
+        "email_intune": _at(intune, "email", it_pos),
+        "en_ad": ad_pos >= 0,
+        "usuario_habilitado_ad": _at(ad, "enabled", ad_pos),
+    })
+    # tenant de origen de cada fuente (combine_tenants), si viene
+    if "origen" in intune:
+        out.insert(out.columns.get_loc("en_ad"), "origen_intune", _at(intune, "origen", it_pos))
+    if "origen" in ad:
+        out["origen_ad"] = _at(ad, "origen", ad_pos)
+
+    it_codes = intune_alert_codes(out, it_pos < 0)
+    ad_codes = ad_alert_codes(out["usuario_habilitado_ad"], ad_pos < 0)
+    out["Alertas Intune"] = pd.Categorical.from_codes(it_codes, categories=INTUNE_ALERTS)
+    out["Alertas AD"] = pd.Categorical.from_codes(ad_codes, categories=AD_ALERTS)
+    out["Alertas"] = pd.Categorical.from_codes(it_codes * len(AD_ALERTS) + ad_codes, categories=RECONCILE_ALERTS)
+    return out
+
+def reconcile_summary(report: pd.DataFrame) -> dict:
+    """Conteos para el encabezado del reporte (equipos, en Intune, usuario habilitado, con alertas)."""
+    return {
+        "equipos": len(report),
+        "en_intune": int(report["en_intune"].sum()),
+        "en_ad": int(report["en_ad"].sum()),
+        "usuario_habilitado": int(report["usuario_habilitado_ad"].fillna(False).sum()),
+        "con_alertas": int((report["Alertas"] != "").sum()),
+    }
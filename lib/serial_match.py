@@ -0,0 +1,149 @@
+# lib/serial_match.py
+# Propuestas de match para las series de la CMDB que no existen tal cual en Intune.
+# Sin comparar todos contra todos (N×M): claves canónicas + bloqueo por vecindario de borrados.
+import numpy as np
+import pandas as pd
+
+from lib.dtypes import STR_DTYPE, clean_str
+from lib.profiling import profiled, stage
+
+# "S/N 5CG...", "SN: 5CG...", "Serial Number - 5CG...": el prefijo se quita (SN solo con separador)
+SERIAL_PREFIX = r"^(?:S/N|N/S)\s*[:#.\-]?\s*|^(?:SN|NS|SERIAL(?:\s*NUMBER)?|SERIE)\s*[:#.\-]\s*"
+# claves más cortas generan demasiados vecinos (y casi siempre son basura: "123", "N/A")
+FUZZY_MIN_LEN = 6
+# una variante compartida por más claves que esto no discrimina (p.ej. prefijos de fábrica): se ignora
+FUZZY_MAX_BUCKET = 50
+
+MATCH_CRITERIA = ["serie canónica", "serie a 1 edición", "hostname"]
+
+def canonical_serial(s: pd.Series) -> pd.Series:
+    """Clave de comparación: mayúsculas, sin prefijo S/N, solo [0-9A-Z] y sin ceros a la izquierda."""
+    s = clean_str(s).str.upper()
+    s = s.str.replace(SERIAL_PREFIX, "", regex=True)
+    s = s.str.replace(r"[^0-9A-Z]", "", regex=True)
+    return s.str.lstrip("0")
+
+def canonical_hostname(s: pd.Series) -> pd.Series:
+    """Hostname sin dominio (PC01.pacifico.local -> pc01), en minúsculas."""
+    return clean_str(s, lower=True).str.split(".").str[0].fillna("")
+
+def _deletions(keys: pd.Series) -> pd.DataFrame:
+    """(id, pos, variante): la clave misma (pos -1) y cada borrado de un carácter, para claves de
+    FUZZY_MIN_LEN o más.
+
+    Dos claves a una edición (sustitución, inserción/borrado o transposición) comparten al menos
+    una variante, así que el cruce por variante da todos los candidatos sin recorrer N×M.
+    """
+    keys = keys[keys.str.len() >= FUZZY_MIN_LEN]
+    lengths = keys.str.len().to_numpy()
+    parts = [pd.DataFrame({"id": keys.index, "pos": -1, "variante": keys.to_numpy()})]
+    for i in range(int(lengths.max()) if len(keys) else 0):
+        k = keys[lengths > i]
+        parts.append(pd.DataFrame({"id": k.index, "pos": i,
+                                   "variante": (k.str.slice(0, i) + k.str.slice(i + 1)).to_numpy()}))
+    return pd.concat(parts, ignore_index=True).astype({"variante": STR_DTYPE})
+
+class SerialIndex:
+    """Índice de series de Intune por clave canónica, vecindario de borrados y hostname."""
+
+    def __init__(self, intune_std: pd.DataFrame):
+        self.intune = intune_std.reset_index(drop=True)
+        self.keys = canonical_serial(self.intune["serial"])
+        self.hosts = canonical_hostname(self.intune["hostname"])
+        valid = self.keys != ""
+        self.by_key = pd.DataFrame({"clave": self.keys[valid], "id": self.keys.index[valid]})
+        hosts = self.hosts[self.hosts != ""]
+        self.by_host = pd.DataFrame({"host": hosts, "id": hosts.index})
+        self.by_host = self.by_host[self.by_host.groupby("host")["id"].transform("size") <= FUZZY_MAX_BUCKET]
+        dels = _deletions(self.keys[valid])
+        bucket = dels.groupby("variante")["id"].transform("size")
+        self.by_variant = dels[bucket <= FUZZY_MAX_BUCKET]
+
+    def candidates(self, cmdb_std: pd.DataFrame) -> pd.DataFrame:
+        """Pares (fila CMDB, fila Intune, criterio, distancia) por cada criterio de MATCH_CRITERIA."""
+        cmdb = cmdb_std.reset_index(drop=True)
+        keys = canonical_serial(cmdb["serial"])
+        q = pd.DataFrame({"q": keys.index, "clave": keys})[keys != ""]
+        exact = q.merge(self.by_key, on="clave")[["q", "id"]].assign(criterio=0, distancia=0)
+
+        qdel = _deletions(keys[(keys != "") & ~keys.isin(self.by_key["clave"])])
+        fuzzy = qdel.merge(self.by_variant, on="variante", suffixes=("_q", ""))
+        # la posición de los borrados ya dice la distancia: original vs borrado = inserción,
+        # mismo borrado = sustitución; borrados vecinos (p, p±1) con la misma variante son una
+        # transposición solo si el carácter borrado de la CMDB es el borrado de Intune
+        pq, pi = fuzzy["pos_q"].to_numpy(), fuzzy["pos"].to_numpy()
+        dist = np.where((pq < 0) | (pi < 0) | (pq == pi), 1, 2)
+        adjacent = np.flatnonzero((pq >= 0) & (pi >= 0) & (np.abs(pq - pi) == 1))
+        if len(adjacent):
+            qk, ik = keys.to_numpy(object), self.keys.to_numpy(object)
+            qa, ib = fuzzy["id_q"].to_numpy()[adjacent], fuzzy["id"].to_numpy()[adjacent]
+            swap = np.fromiter((qk[a][p] == ik[b][r] for a, b, p, r in zip(qa, ib, pq[adjacent], pi[adjacent])),
+                               dtype=bool, count=len(adjacent))
+            dist[adjacent[swap]] = 1
+        fuzzy = (pd.DataFrame({"q": fuzzy["id_q"].to_numpy(), "id": fuzzy["id"].to_numpy(), "distancia": dist})
+                 .groupby(["q", "id"], as_index=False)["distancia"].min())
+        fuzzy = fuzzy[fuzzy["distancia"] == 1].assign(criterio=1, distancia=1)[["q", "id", "criterio", "distancia"]]
+
+        hosts = canonical_hostname(cmdb["hostname"])
+        h = pd.DataFrame({"q": hosts.index, "host": hosts})[hosts != ""]
+        by_host = h.merge(self.by_host, on="host")[["q", "id"]].assign(criterio=2, distancia=-1)
+        return pd.concat([exact, fuzzy, by_host], ignore_index=True)
+
+@profiled
+def propose_serial_matches(result: pd.DataFrame, intune_std: pd.DataFrame) -> pd.DataFrame:
+    """Para cada fila "Serie no existe en Intune" del resultado, la serie de Intune más probable.
+
+    Solo se indexan las series de Intune que no cruzaron exacto con la CMDB. Por fila se elige el
+    mejor criterio (canónica > 1 edición > hostname) y, a igual criterio, el candidato que además
+    coincide en correo y hostname. `candidatos` > 1 indica una propuesta ambigua.
+    """
+    missing = result[result["Alertas"] == "Serie no existe en Intune"]
+    cols = ["serial_cmdb", "serial_intune", "criterio", "distancia", "candidatos",
+            "hostname_cmdb", "hostname_intune", "email_cmdb", "email_intune",
+            "coincide_correo", "coincide_hostname"]
+    if missing.empty:
+        return pd.DataFrame(columns=cols)
+
+    cmdb = pd.DataFrame({"serial": missing["serial"], "email": missing["email_cmdb"],
+                         "hostname": missing["hostname_cmdb"]}).astype(STR_DTYPE).reset_index(drop=True)
+    free = intune_std[~intune_std["serial"].isin(result["serial"])]
+    if free.empty:
+        return pd.DataFrame(columns=cols)
+
+    with stage("propose_serial_matches.index", len(free)):
+        index = SerialIndex(free.astype({c: STR_DTYPE for c in ("serial", "email", "hostname")}))
+    with stage("propose_serial_matches.candidates", len(cmdb)) as info:
+        pairs = index.candidates(cmdb)
+        info["rows_out"] = len(pairs)
+    if pairs.empty:
+        return pd.DataFrame(columns=cols)
+
+    q, i = pairs["q"].to_numpy(), pairs["id"].to_numpy()
+    pairs["coincide_correo"] = (cmdb["email"].str.lower().to_numpy(object)[q]
+                                == index.intune["email"].to_numpy(object)[i]) & (cmdb["email"].to_numpy(object)[q] != "")
+    pairs["coincide_hostname"] = (canonical_hostname(cmdb["hostname"]).to_numpy(object)[q]
+                                  == index.hosts.to_numpy(object)[i]) & (index.hosts.to_numpy(object)[i] != "")
+    pairs["evidencia"] = pairs["coincide_correo"].astype(int) + pairs["coincide_hostname"].astype(int)
+
+    # mejor criterio por fila; dentro de él, más evidencia
+    pairs = pairs[pairs["criterio"] == pairs.groupby("q")["criterio"].transform("min")]
+    pairs["candidatos"] = pairs.groupby("q")["id"].transform("size")
+    best = pairs.sort_values(["q", "evidencia"], ascending=[True, False], kind="stable").drop_duplicates("q")
+
+    q, i = best["q"].to_numpy(), best["id"].to_numpy()
+    out = pd.DataFrame({
+        "serial_cmdb": cmdb["serial"].to_numpy()[q],
+        "serial_intune": index.intune["serial"].to_numpy()[i],
+        "criterio": pd.Categorical.from_codes(best["criterio"], categories=MATCH_CRITERIA),
+        "distancia": pd.Series(best["distancia"].to_numpy(), dtype="Int64").mask(best["distancia"].to_numpy() < 0),
+        "candidatos": best["candidatos"].to_numpy(),
+        "hostname_cmdb": cmdb["hostname"].to_numpy()[q],
+        "hostname_intune": index.intune["hostname"].to_numpy()[i],
+        "email_cmdb": cmdb["email"].to_numpy()[q],
+        "email_intune": index.intune["email"].to_numpy()[i],
+        "coincide_correo": best["coincide_correo"].to_numpy(),
+        "coincide_hostname": best["coincide_hostname"].to_numpy(),
+    })
+    if "origen" in index.intune:
+        out["origen_intune"] = index.intune["origen"].to_numpy()[i]  # tenant de la serie propuesta
+    return out
@@ -0,0 +1,117 @@
+# lib/snapshots.py
+import glob
+import json
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from lib.profiling import profiled
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Snapshots columnares (Parquet) de los datasets normalizados, por etapa y hash del archivo fuente
+SNAPSHOT_DIR = os.environ.get("CMDB_SNAPSHOT_DIR", ".snapshots")
+SNAPSHOT_KEEP = int(os.environ.get("CMDB_SNAPSHOT_KEEP", "30"))  # por etapa
+
+def _kind_dir(kind: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, kind)
+
+def snapshot_path(kind: str, source_hash: str, day: datetime = None) -> str:
+    day = day or datetime.now()
+    return os.path.join(_kind_dir(kind), f"{day:%Y-%m-%d}_{source_hash[:16]}.parquet")
+
+def find_snapshot(kind: str, source_hash: str):
+    matches = sorted(glob.glob(os.path.join(_kind_dir(kind), f"*_{source_hash[:16]}.parquet")))
+    return matches[-1] if matches else None
+
+def _to_table(df: pd.DataFrame):
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # columnas object con tipos mezclados (típico del Excel crudo): se guardan como texto
+        df = df.copy()
+        for c in df.columns:
+            if df[c].dtype == object:
+                df[c] = df[c].map(lambda x: x if x is None or isinstance(x, (str, bool)) else str(x))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+@profiled
+def save_snapshot(df: pd.DataFrame, kind: str, source_hash: str) -> str:
+    path = snapshot_path(kind, source_hash)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    table = _to_table(df)
+    meta = dict(table.schema.metadata or {})
+    meta[b"cmdb_snapshot"] = json.dumps({
+        "kind": kind,
+        "source_hash": source_hash,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "rows": len(df),
+    }).encode()
+    table = table.replace_schema_metadata(meta)
+
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)  # escritura atómica: nunca queda un snapshot a medias
+    _prune(kind)
+    return path
+
+def _prune(kind: str) -> None:
+    files = sorted(glob.glob(os.path.join(_kind_dir(kind), "*.parquet")), key=os.path.getmtime)
+    for old in files[:-SNAPSHOT_KEEP]:
+        os.remove(old)
+
+def _types_mapper(arrow_type):
+    # texto -> string[pyarrow]: sin esto vuelve como str de Python (string[python] / object)
+    if arrow_type in (pa.string(), pa.large_string()):
+        return pd.StringDtype("pyarrow")
+    return None
+
+@profiled
+def load_snapshot(path: str) -> pd.DataFrame:
+    # lectura memory-mapped: sin reparsear el Excel/CSV original
+    return pq.read_table(path, memory_map=True).to_pandas(types_mapper=_types_mapper)
+
+def snapshot_info(path: str) -> dict:
+    meta = pq.read_schema(path, memory_map=True).metadata or {}
+    info = json.loads(meta.get(b"cmdb_snapshot", b"{}"))
+    info["path"] = path
+    return info
+
+def list_snapshots(kind: str) -> pd.DataFrame:
+    cols = ["created", "source_hash", "rows", "path"]
+    if not HAS_PYARROW:
+        return pd.DataFrame(columns=cols)
+    files = glob.glob(os.path.join(_kind_dir(kind), "*.parquet"))
+    rows = [snapshot_info(p) for p in files]
+    if not rows:
+        return pd.DataFrame(columns=cols)
+    return pd.DataFrame(rows)[cols].sort_values("created", ascending=False, ignore_index=True)
+
+def snapshot_or_compute(kind: str, source_hash: str, fn, *args, **kwargs) -> pd.DataFrame:
+    """Carga el snapshot de (etapa, hash) si existe; si no, calcula y lo guarda."""
+    if not HAS_PYARROW:
+        return fn(*args, **kwargs)
+    path = find_snapshot(kind, source_hash)
+    if path is not None:
+        try:
+            t0 = time.perf_counter()
+            df = load_snapshot(path)
+            df.attrs["read_report"] = {"strategy": "snapshot", "engine": "parquet", "attempts": 1,
+                                       "path": path, "seconds": time.perf_counter() - t0}
+            return df
+        except Exception:
+            pass  # snapshot corrupto o de otra versión: se recalcula
+    df = fn(*args, **kwargs)
+    try:
+        save_snapshot(df, kind, source_hash)
+    except (OSError, pa.ArrowException):
+        pass  # disco de solo lectura / lleno: seguimos sin snapshot
+    return df
@@ -0,0 +1,111 @@
+# lib/tenant_index.py
+# Unión de los frames de N tenants por clave (serie en Intune, correo en AD) sobre un índice hash
+# por tenant: sin concatenar los frames completos, con la procedencia de cada clave y los
+# conflictos entre tenants (p.ej. cuenta habilitada en uno y deshabilitada en otro).
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+from lib.dtypes import STR_DTYPE
+from lib.profiling import stage
+
+class TenantIndex:
+    """Índice por clave sobre los frames normalizados de cada tenant.
+
+    `tenant_std` = {tenant: (std, report)} como lo entrega ingest_parallel; el orden de los
+    tenants es el de precedencia (si una clave está en varios, `merged` toma el primero).
+    Las claves de todos los tenants se factorizan juntas (solo la columna clave, no los frames):
+    `keys` es un índice hash sobre ellas y `pos[k, i]` la fila de la clave k en el tenant i (-1 si
+    no está), así que buscar una clave en N tenants es un solo lookup.
+    """
+
+    def __init__(self, tenant_std: dict, key: str):
+        self.key = key
+        self.tenants = list(tenant_std)
+        self.frames = {t: std for t, (std, _) in tenant_std.items()}
+        with stage(f"tenant_index.{key}", sum(len(f) for f in self.frames.values())) as info:
+            # códigos en orden de aparición: primero las claves del primer tenant, luego las nuevas de cada uno
+            codes, uniques = pd.factorize(pd.concat([f[key].astype(STR_DTYPE) for f in self.frames.values()],
+                                                    ignore_index=True))
+            self.keys = pd.Index(uniques, dtype=STR_DTYPE)
+            self.pos = np.full((len(uniques), len(self.tenants)), -1, dtype=np.int64)
+            start = 0
+            for i, f in enumerate(self.frames.values()):
+                # repetida dentro del tenant: manda la primera fila
+                seen, rows = np.unique(codes[start:start + len(f)], return_index=True)
+                self.pos[seen, i] = rows
+                start += len(f)
+            info["rows_out"] = len(uniques)
+
+    def positions(self, tenant: str, keys) -> np.ndarray:
+        """Fila de cada clave de `keys` en el frame de `tenant` (-1 si no está)."""
+        loc = self.keys.get_indexer(pd.Index(keys).astype(STR_DTYPE))
+        return np.where(loc >= 0, self.pos[loc, self.tenants.index(tenant)], -1)
+
+    def lookup(self, value: str) -> dict:
+        """{tenant: fila} de los tenants donde está la clave `value`."""
+        if value not in self.keys:
+            return {}
+        rows = self.pos[self.keys.get_loc(value)]
+        return {t: self.frames[t].iloc[r] for t, r in zip(self.tenants, rows) if r >= 0}
+
+    def origenes(self) -> pd.Categorical:
+        """Tenants donde está cada clave ("pacifico; prima"), como categórica (un código por clave)."""
+        bits = (self.pos >= 0).astype(np.int64) @ (1 << np.arange(len(self.tenants), dtype=np.int64))
+        labels = ["; ".join(t for i, t in enumerate(self.tenants) if code >> i & 1)
+                  for code in range(1 << len(self.tenants))]
+        return pd.Categorical.from_codes(bits, categories=labels)
+
+    def merged(self) -> pd.DataFrame:
+        """Una fila por clave, tomada del primer tenant donde está, con `origen` y `origenes`.
+
+        Mismo resultado que concat + drop_duplicates(keep="first"), copiando solo las filas que quedan.
+        """
+        present = self.pos >= 0
+        first = present.argmax(axis=1)
+        # categórico: un código por fila
+        origen = pd.CategoricalDtype(self.tenants)
+        parts = []
+        for i, t in enumerate(self.tenants):
+            rows = self.pos[first == i, i]
+            parts.append(self.frames[t].take(rows).assign(
+                origen=pd.Categorical.from_codes(np.full(len(rows), i), dtype=origen)))
+        out = pd.concat(parts, ignore_index=True)
+        # self.keys ya está en bloques por primer tenant: las filas de `out` siguen su orden
+        out["origenes"] = self.origenes()
+        return out
+
+    def conflicts(self, columns: list) -> pd.DataFrame:
+        """Claves presentes en más de un tenant cuyos `columns` difieren entre ellos.
+
+        Una fila por clave: la clave, `origenes`, `Conflicto` (columnas que difieren) y el valor de
+        cada columna en cada tenant (`{columna}_{tenant}`, <NA> si el tenant no tiene la clave).
+        """
+        present = self.pos >= 0
+        multi = np.flatnonzero((present.sum(axis=1) > 1) & np.asarray(self.keys != "", dtype=bool))
+        pos, present = self.pos[multi], present[multi]
+        first = present.argmax(axis=1)
+        rows = np.arange(len(multi))
+
+        values, differs = {}, []
+        for c in columns:
+            per_tenant = [take(self.frames[t][c].array, pos[:, i], allow_fill=True)
+                          for i, t in enumerate(self.tenants)]
+            # texto comparable (True/False/<NA> incluidos); solo cuentan los tenants que tienen la clave
+            text = np.column_stack([pd.Series(v).astype(STR_DTYPE).fillna("<NA>").to_numpy(object)
+                                    for v in per_tenant])
+            differs.append((present & (text != text[rows, first][:, None])).any(axis=1))
+            for t, v in zip(self.tenants, per_tenant):
+                values[f"{c}_{t}"] = v
+
+        codes = (np.column_stack(differs).astype(np.int64) @ (1 << np.arange(len(columns), dtype=np.int64))
+                 if columns else np.zeros(len(multi), dtype=np.int64))
+        labels = ["; ".join(f"{c} distinto" for i, c in enumerate(columns) if code >> i & 1)
+                  for code in range(1 << len(columns))]
+        out = pd.DataFrame({
+            self.key: self.keys[multi],
+            "origenes": self.origenes()[multi],
+            "Conflicto": pd.Categorical.from_codes(codes, categories=labels),
+            **values,
+        })
+        return out[codes > 0].reset_index(drop=True)
@@ -0,0 +1,191 @@
+# lib/ui_utils.py
+import math
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from lib.alert_history import HISTORY_ENABLED, record_run
+from lib.alerts import alert_codes, alert_summary
+from lib.dtypes import STR_DTYPE
+from lib.ingest import LocalFile, inbox_files, spool_upload
+from lib.ingest_cache import ingest_cache, frame_hash
+from lib.io_utils import EXPORT_FORMATS, export_bytes
+from lib.profiling import ProfileRun
+from lib.snapshots import list_snapshots
+
+PROFILE_DEFAULT = os.environ.get("CMDB_PROFILE", "0") == "1"
+PAGE_SIZES = [50, 100, 500, 1000]
+
+def snapshot_picker(kind: str, label: str, key: str):
+    """Selector de snapshots guardados de una etapa. Devuelve la ruta elegida o None."""
+    snaps = list_snapshots(kind)
+    if snaps.empty:
+        return None
+    options = [None] + snaps["path"].tolist()
+    labels = {
+        row.path: f"{row.created} · {row.rows} filas · {str(row.source_hash)[:8]}"
+        for row in snaps.itertuples()
+    }
+    return st.selectbox(label, options, key=key,
+                        format_func=lambda p: "(usar el archivo subido)" if p is None else labels[p])
+
+def file_input(label: str, types: list, key: str):
+    """file_uploader que vuelca a disco los uploads grandes (spool_upload) y, si hay carpeta
+    compartida (CMDB_INBOX_DIR), deja elegir un archivo que ya está en el servidor.
+
+    Devuelve el archivo (UploadedFile o LocalFile) o None.
+    """
+    uploaded = st.file_uploader(label, type=types, key=key)
+    if uploaded is not None:
+        return spool_upload(uploaded)
+    files = inbox_files(tuple(f".{t}" for t in types))
+    if not files:
+        return None
+    path = st.selectbox("…o tómalo de la carpeta compartida", [None] + files, key=f"{key}_inbox",
+                        format_func=lambda p: "(ninguno)" if p is None else os.path.basename(p))
+    return LocalFile(path) if path else None
+
+def _search_mask(df: pd.DataFrame, text: str) -> np.ndarray:
+    """Filas donde alguna columna de texto contiene `text` (sin distinguir mayúsculas)."""
+    mask = np.zeros(len(df), dtype=bool)
+    for c in df.columns:
+        s = df[c]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            # se busca en las categorías (pocas) y se marcan sus códigos
+            hit = s.cat.categories.astype(str).str.contains(text, case=False, regex=False)
+            mask |= np.isin(s.cat.codes.to_numpy(), np.flatnonzero(hit))
+        elif s.dtype == object or isinstance(s.dtype, pd.StringDtype):
+            mask |= s.astype(STR_DTYPE).str.contains(text, case=False, regex=False).to_numpy(dtype=bool, na_value=False)
+    return mask
+
+def result_viewer(df: pd.DataFrame, key: str, alert_col: str = "Alertas", alert_labels: list = None) -> None:
+    """Tabla paginada del lado del servidor: filtro por tipo de alerta, búsqueda y orden.
+
+    Solo la página visible viaja al navegador; los conteos por alerta se calculan aquí.
+    """
+    if df.empty:
+        st.caption("Sin filas.")
+        return
+    summary = alert_summary(df[alert_col], alert_labels) if alert_col in df else pd.Series(dtype="int64")
+    if not summary.empty:
+        cols = st.columns(min(len(summary), 6))
+        for i, (label, n) in enumerate(summary.items()):
+            cols[i % len(cols)].metric(label, f"{n:,}")
+
+    c1, c2, c3, c4 = st.columns([3, 3, 2, 1])
+    labels = c1.multiselect("Tipo de alerta", summary.index.tolist(), key=f"{key}_alerts",
+                            placeholder="Todas")
+    search = c2.text_input("Buscar", key=f"{key}_search", placeholder="serie, hostname, correo…").strip()
+    sort_col = c3.selectbox("Ordenar por", [None] + list(df.columns), key=f"{key}_sort",
+                            format_func=lambda c: "(orden original)" if c is None else c)
+    desc = c4.checkbox("Desc.", key=f"{key}_desc")
+
+    view = df
+    if labels:
+        codes, by_label = alert_codes(df[alert_col], alert_labels)
+        view = view[np.isin(codes, [c for label in labels for c in by_label[label]])]
+    if search:
+        view = view[_search_mask(view, search)]
+    if sort_col is not None:
+        view = view.sort_values(sort_col, ascending=not desc, kind="stable")
+
+    c1, c2, c3 = st.columns([1, 1, 4])
+    size = c1.selectbox("Filas por página", PAGE_SIZES, index=1, key=f"{key}_size")
+    pages = max(1, math.ceil(len(view) / size))
+    # otro filtro u otro frame: volver a la primera página
+    signature = (tuple(labels), search, sort_col, desc, size, len(df))
+    if st.session_state.get(f"{key}_signature") != signature or st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_signature"] = signature
+        st.session_state[f"{key}_page"] = 1
+    page = c2.number_input(f"Página (de {pages:,})", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    start = (page - 1) * size
+    c3.caption(f"Filas {min(start + 1, len(view)):,}–{min(start + size, len(view)):,} de {len(view):,}"
+               f"{'' if len(view) == len(df) else f' (filtradas de {len(df):,})'}")
+    st.dataframe(view.iloc[start:start + size], use_container_width=True)
+
+def export_panel(df, sheet_name: str, base_filename: str, label: str, key: str) -> None:
+    """Descarga bajo demanda: el archivo solo se genera al pedirlo y se cachea por hash del resultado."""
+    col_fmt, col_btn = st.columns([3, 2])
+    with col_fmt:
+        fmt = st.radio("Formato", list(EXPORT_FORMATS), horizontal=True, key=f"{key}_fmt",
+                       help="xlsx se escribe en streaming; csv y parquet son más rápidos para reportes grandes.")
+    with col_btn:
+        prepare = st.button(f"Preparar {label}", key=f"{key}_prepare")
+
+    # el pedido vale para este resultado y formato: si cambian (otra regla, otro archivo) se olvida
+    ready = f"{key}_ready"
+    if prepare:
+        st.session_state[ready] = (frame_hash(df), fmt)
+    if ready not in st.session_state:
+        return
+    digest, ready_fmt = st.session_state[ready]
+    if ready_fmt != fmt or (not prepare and frame_hash(df) != digest):
+        del st.session_state[ready]
+        return
+
+    ext, mime = EXPORT_FORMATS[fmt]
+    data = ingest_cache.get_or_compute(("export", digest, fmt, sheet_name), export_bytes, df, fmt, sheet_name)
+    st.download_button(f"📥 Descargar {label} (.{ext})", data=data, file_name=f"{base_filename}.{ext}",
+                       mime=mime, key=f"{key}_download")
+
+def history_button(kind: str, result: pd.DataFrame, key: str) -> None:
+    """Guarda la corrida en el historial de alertas solo cuando el usuario lo pide (no en cada rerun)."""
+    if not HISTORY_ENABLED or result.empty:
+        return
+    if not st.button("💾 Guardar en historial", key=f"{key}_history",
+                     help="Agrega esta corrida a la página Historial (tendencias y historia por equipo)."):
+        return
+    try:
+        run_id = record_run(kind, result)
+    except (OSError, sqlite3.Error) as e:
+        st.error(f"No se pudo guardar en el historial: {e}")
+        return
+    if run_id:
+        st.success("Corrida guardada en el historial.")
+    else:
+        st.info("Esta corrida ya estaba guardada en el historial de hoy.")
+
+def conflicts_panel(conflicts: pd.DataFrame, label: str, key: str) -> None:
+    """Claves repetidas entre tenants con datos distintos (salida de combine_tenants)."""
+    st.subheader(f"Conflictos entre tenants ({label})")
+    if conflicts.empty:
+        st.caption("Ninguna clave presente en varios tenants tiene datos distintos.")
+        return
+    st.caption(f"{len(conflicts):,} claves están en más de un tenant con datos distintos; "
+               "la comparación usa el registro del primer tenant (columna `origen`).")
+    result_viewer(conflicts, key=f"{key}_viewer", alert_col="Conflicto")
+    export_panel(conflicts, "Conflictos", f"conflictos_tenants_{label.lower()}", "conflictos", key=f"{key}_export")
+
+def delta_panel(out: dict) -> None:
+    """Alertas nuevas / resueltas respecto de la corrida anterior (salida de run_intune / run_ad)."""
+    delta, inc_stats = out["delta"], out["inc_stats"]
+    st.subheader("Cambios desde la última corrida")
+    if out["prev_created"] is None:
+        st.info("No hay una corrida anterior guardada: se hizo la comparación completa.")
+        return
+    st.caption(
+        f"Corrida anterior: {out['prev_created']} · claves recalculadas: "
+        f"{inc_stats.get('recomputed_keys', inc_stats['recomputed_rows'])} · modo: {inc_stats['mode']}"
+    )
+    c1, c2 = st.columns(2)
+    c1.metric("Alertas nuevas", int((delta["Estado"] == "nueva").sum()))
+    c2.metric("Alertas resueltas", int((delta["Estado"] == "resuelta").sum()))
+    st.dataframe(delta, use_container_width=True)
+
+def profiling_panel(run: ProfileRun, key: str) -> None:
+    """Panel de debug (opcional): tiempos, filas y memoria por etapa de esta corrida, exportable a JSON."""
+    if not st.sidebar.checkbox("🛠️ Perfil de ejecución (debug)", value=PROFILE_DEFAULT, key=f"{key}_profile"):
+        return
+    df = run.to_frame()
+    with st.expander(f"Perfil de ejecución · {len(df)} etapas", expanded=True):
+        if df.empty:
+            st.caption("Sin etapas registradas en esta corrida.")
+            return
+        df = df.assign(etapa=["\u2003" * n + e for n, e in zip(df["nivel"], df["etapa"])])  # sangría por anidamiento
+        st.dataframe(df.drop(columns="nivel"), use_container_width=True, hide_index=True)
+        st.download_button("📥 Descargar perfil (.json)", data=run.to_json(),
+                           file_name=f"perfil_{key}_{run.created.replace(':', '')}.json",
+                           mime="application/json", key=f"{key}_profile_download")
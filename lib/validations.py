@@ -0,0 +1,100 @@
+# lib/validations.py
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from lib.dtypes import STR_DTYPE
+from lib.ingest_cache import ingest_cache
+from lib.profiling import profiled
+
+# Regla declarativa: cada una produce una máscara booleana y ocupa un bit del bitmask.
+# El orden de RULES es el orden en que aparecen los mensajes dentro de "Alertas".
+# `params` = parámetros de cfg["params"] que usa la regla (forman parte de la clave de su máscara).
+Rule = namedtuple("Rule", ["group", "name", "column", "message", "check", "params"], defaults=[()])
+
+def _vacio(s: pd.Series, p: dict) -> np.ndarray:
+    return (s == "").to_numpy(dtype=bool)
+
+def _espacios(s: pd.Series, p: dict) -> np.ndarray:
+    return s.str.contains(" ", regex=False, na=False).to_numpy(dtype=bool)
+
+def _minlen(param: str):
+    def check(s: pd.Series, p: dict) -> np.ndarray:
+        return (s.str.len() < int(p[param])).to_numpy(dtype=bool)
+    return check
+
+def _dominio(s: pd.Series, p: dict) -> np.ndarray:
+    allowed = p["allowed_domains"]
+    if not allowed:
+        return np.zeros(len(s), dtype=bool)
+    # una sola regex con todos los dominios (mismo criterio "contiene" que antes)
+    pattern = "|".join(re.escape(d) for d in allowed)
+    return (~s.str.lower().str.contains(pattern, regex=True, na=False)).to_numpy(dtype=bool)
+
+def _duplicado(s: pd.Series, p: dict) -> np.ndarray:
+    codes, _ = pd.factorize(s)
+    counts = np.bincount(codes[codes >= 0], minlength=1)
+    return (counts[codes] > 1) & (s != "").to_numpy(dtype=bool)
+
+RULES = [
+    Rule("serie", "vacio",    "Número de serie",    "Serie vacía. ",                      _vacio),
+    Rule("serie", "espacios", "Número de serie",    "Serie contiene espacios. ",          _espacios),
+    Rule("serie", "minlen",   "Número de serie",    "Serie menor a longitud mínima. ",    _minlen("minlen_serie"), ("minlen_serie",)),
+    Rule("host",  "vacio",    "Hostname",           "Hostname vacío. ",                   _vacio),
+    Rule("host",  "espacios", "Hostname",           "Hostname contiene espacios. ",       _espacios),
+    Rule("host",  "minlen",   "Hostname",           "Hostname menor a longitud mínima. ", _minlen("minlen_host"), ("minlen_host",)),
+    Rule("mail",  "vacio",    "Correo Electrónico", "Correo vacío. ",                     _vacio),
+    Rule("mail",  "espacios", "Correo Electrónico", "Correo contiene espacios. ",         _espacios),
+    Rule("mail",  "dominio",  "Correo Electrónico", "Correo no pertenece a dominios permitidos. ", _dominio,
+         ("allowed_domains",)),
+    Rule("dups",  "serie",    "Número de serie",    "Serie duplicada. ",                  _duplicado),
+    Rule("dups",  "host",     "Hostname",           "Hostname duplicado. ",               _duplicado),
+    Rule("dups",  "mail",     "Correo Electrónico", "Correo duplicado. ",                 _duplicado),
+]
+# alertas individuales (sin el separador) para filtrar/contar las combinaciones de "Alertas"
+ALERT_LABELS = [rule.message.strip() for rule in RULES]
+
+def _param_key(value):
+    return tuple(value) if isinstance(value, list) else value
+
+def rule_bitmask(df: pd.DataFrame, cfg, key: tuple = None) -> np.ndarray:
+    """Evalúa las reglas activas y devuelve un bit por regla (bit i = RULES[i]).
+
+    Con `key` (identidad de `df`, p.ej. hash del archivo + filtros) la máscara de cada regla se
+    cachea por (key, regla, sus parámetros): activar/desactivar una regla o cambiar un parámetro
+    solo recalcula esa máscara.
+    """
+    r = cfg["rules"]; p = cfg["params"]
+    bits = np.zeros(len(df), dtype=np.uint16)
+    cols = {}
+
+    def mask_of(rule):
+        if rule.column not in cols:
+            # una sola conversión por columna a strings Arrow: los .str corren en C++
+            cols[rule.column] = df[rule.column].astype(STR_DTYPE)
+        return rule.check(cols[rule.column], p)
+
+    for i, rule in enumerate(RULES):
+        if not r[rule.group][rule.name]:
+            continue
+        if key is None:
+            mask = mask_of(rule)
+        else:
+            rule_key = (*key, "rule", rule.group, rule.name, *(_param_key(p[x]) for x in rule.params))
+            mask = ingest_cache.get_or_compute(rule_key, mask_of, rule)
+        bits |= mask.astype(np.uint16) << np.uint16(i)
+    return bits
+
+def bitmask_to_alerts(bits: np.ndarray) -> pd.Categorical:
+    """"Alertas" como categórica: un texto por combinación distinta de reglas, un código por fila."""
+    codes, inverse = np.unique(bits, return_inverse=True)
+    labels = ["".join(rule.message for i, rule in enumerate(RULES) if int(code) >> i & 1) for code in codes]
+    return pd.Categorical.from_codes(inverse.reshape(-1), categories=labels)
+
+@profiled
+def apply_validations(df: pd.DataFrame, cfg, key: tuple = None) -> pd.DataFrame:
+    df = df.copy()
+    df["Alertas"] = bitmask_to_alerts(rule_bitmask(df, cfg, key))
+    return df
@@ -0,0 +1,227 @@
+# lib/xlsx_stream.py
+# Lectura por columnas de un .xlsx: el XML de la hoja se recorre por bloques con expresiones
+# regulares y solo se decodifican las celdas de las columnas pedidas. openpyxl (y pd.read_excel
+# encima) crea un objeto Python por cada celda de cada columna, se usen o no.
+import codecs
+import html
+import re
+import zipfile
+
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+CHUNK_BYTES = 4 * 2**20
+
+# textos que pd.read_excel convierte en NaN por defecto
+NA_VALUES = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+})
+
+_ROW = re.compile(r"<row\b([^>]*?)(?:/>|>(.*?)</row>)", re.S)
+_ROW_NUM = re.compile(r'\br="(\d+)"')
+_CELL = re.compile(r'<c r="([A-Z]+)\d+"([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_TYPE = re.compile(r'\bt="(\w+)"')
+_STYLE = re.compile(r'\bs="(\d+)"')
+_VALUE = re.compile(r"<v>(.*?)</v>", re.S)
+_TEXT = re.compile(r"<t(?:\s[^>]*)?>(.*?)</t>", re.S)
+_PHONETIC = re.compile(r"<rPh\b.*?</rPh>", re.S)
+_ATTR = re.compile(r'([\w:]+)="([^"]*)"')
+
+class XlsxLayoutError(Exception):
+    """El archivo no tiene la forma que espera el lector por columnas (se usa pd.read_excel)."""
+
+def _col_index(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n - 1
+
+def _attrs(text: str) -> dict:
+    return dict(_ATTR.findall(text))
+
+def _text(raw: str):
+    s = html.unescape(raw) if "&" in raw else raw
+    return None if s in NA_VALUES else s
+
+def _first_sheet(z: zipfile.ZipFile):
+    """Ruta de la primera hoja (la que lee pd.read_excel por defecto) y época de fechas del libro."""
+    try:
+        wb = z.read("xl/workbook.xml").decode("utf-8")
+        rels = z.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+    except KeyError:
+        raise XlsxLayoutError("sin xl/workbook.xml")
+    epoch = CALENDAR_MAC_1904 if re.search(r'date1904="(?:1|true)"', wb) else CALENDAR_WINDOWS_1900
+    sheet = re.search(r"<sheet\b([^>]*)", wb)
+    rid = next((v for k, v in _attrs(sheet.group(1)).items() if k.endswith(":id")), None) if sheet else None
+    for rel in re.findall(r"<Relationship\b([^>]*)", rels):
+        a = _attrs(rel)
+        if a.get("Id") == rid and "Target" in a:
+            target = a["Target"]
+            return (target.lstrip("/") if target.startswith("/") else "xl/" + target), epoch
+    raise XlsxLayoutError("no se encontró la primera hoja")
+
+def _shared_strings(z: zipfile.ZipFile) -> list:
+    try:
+        xml = z.read("xl/sharedStrings.xml").decode("utf-8")
+    except KeyError:
+        return []
+    if "<rPh" in xml:
+        xml = _PHONETIC.sub("", xml)  # lectura fonética (japonés): openpyxl tampoco la incluye
+    return [html.unescape("".join(_TEXT.findall(si))).replace("x005F_", "")
+            for si in re.findall(r"<si>(.*?)</si>|<si/>", xml, re.S)]
+
+def _date_styles(z: zipfile.ZipFile) -> dict:
+    """{índice de estilo: es_duración} de los estilos con formato de fecha/hora."""
+    try:
+        xml = z.read("xl/styles.xml").decode("utf-8")
+    except KeyError:
+        return {}
+    formats = dict(BUILTIN_FORMATS)
+    for fmt in re.findall(r"<numFmt\b([^>]*)", xml):
+        a = _attrs(fmt)
+        if "numFmtId" in a:
+            formats[int(a["numFmtId"])] = html.unescape(a.get("formatCode", ""))
+    xfs = re.search(r"<cellXfs\b[^>]*>(.*?)</cellXfs>", xml, re.S)
+    out = {}
+    for i, xf in enumerate(re.findall(r"<xf\b([^>]*)", xfs.group(1) if xfs else "")):
+        code = formats.get(int(_attrs(xf).get("numFmtId", 0)))
+        if code and is_date_format(code):
+            out[i] = is_timedelta_format(code)
+    return out
+
+def _row_chunks(stream):
+    """Filas (matches de _ROW) del XML de la hoja, leído por bloques cortados en un </row>."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    while True:
+        data = stream.read(CHUNK_BYTES)
+        buf += decoder.decode(data, final=not data)
+        if data:
+            cut = buf.rfind("</row>")
+            if cut < 0:
+                continue
+            part, buf = buf[:cut + 6], buf[cut + 6:]
+        else:
+            part, buf = buf, ""
+        if part.count("<c ") != part.count('<c r="'):
+            raise XlsxLayoutError("celdas sin referencia (r) o con otro orden de atributos")
+        yield from _ROW.finditer(part)
+        if not data:
+            return
+
+class _Cells:
+    """Convierte el XML de una celda al mismo valor que entrega pd.read_excel (motor openpyxl)."""
+
+    def __init__(self, shared, dates, epoch):
+        self.shared, self.dates, self.epoch = shared, dates, epoch
+
+    def __call__(self, attrs: str, inner: str):
+        if not inner:
+            return None
+        m = _TYPE.search(attrs)
+        kind = m.group(1) if m else "n"
+        if kind == "inlineStr":
+            return _text("".join(_TEXT.findall(inner)))
+        v = _VALUE.search(inner)
+        if v is None:
+            return None  # fórmula sin valor calculado
+        v = v.group(1)
+        if kind == "s":
+            s = self.shared[int(v)]
+            return None if s in NA_VALUES else s
+        if kind in ("str", "d"):
+            return _text(v)
+        if kind == "b":
+            return bool(int(v))
+        if kind == "e":
+            return None  # #N/A, #REF!...: NaN en pandas
+        num = float(v) if ("." in v or "e" in v or "E" in v) else int(v)
+        if self.dates:
+            s = _STYLE.search(attrs)
+            if s and int(s.group(1)) in self.dates:
+                try:
+                    return from_excel(num, self.epoch, timedelta=self.dates[int(s.group(1))])
+                except (OverflowError, ValueError):
+                    return None
+        if isinstance(num, float) and num.is_integer():
+            return int(num)  # pandas: 1234.0 -> 1234
+        return num
+
+def _key(v) -> str:
+    return "" if v is None else str(v).strip().lower()
+
+def read_xlsx_columns(fh, columns: list, row_filter: dict = None):
+    """Lee de la primera hoja solo `columns`. Devuelve (cabecera, filas).
+
+    La cabecera se valida antes de recorrer las filas: si falta alguna columna, filas es None.
+    `row_filter` = {columna: valores permitidos en minúsculas}; se compara `str(x).strip().lower()`
+    y las filas que no pasan se descartan sin guardarse. Las filas vacías siguen la regla de pandas:
+    se conservan las intermedias y se descartan las del final.
+    Lanza XlsxLayoutError si el archivo no es un .xlsx que este lector sepa recorrer.
+    """
+    try:
+        z = zipfile.ZipFile(fh)
+    except zipfile.BadZipFile as e:
+        raise XlsxLayoutError(str(e))
+    with z:
+        path, epoch = _first_sheet(z)
+        cell = _Cells(_shared_strings(z), _date_styles(z), epoch)
+        try:
+            stream = z.open(path)
+        except KeyError:
+            raise XlsxLayoutError(f"no existe {path}")
+        with stream:
+            rows = _row_chunks(stream)
+            # pd.read_excel descarta las filas vacías del comienzo: la cabecera es la primera fila con datos
+            row_num = 0
+            for first in rows:
+                num = _ROW_NUM.search(first.group(1))
+                row_num = int(num.group(1)) if num else row_num + 1
+                inner = first.group(2)
+                if inner and ("<v>" in inner or "<is>" in inner):
+                    break
+            else:
+                raise XlsxLayoutError("hoja vacía")
+            by_index = {_col_index(letters): cell(attrs, c) for letters, attrs, c in _CELL.findall(inner)}
+            header = [f"Unnamed: {i}" if by_index.get(i) is None else str(by_index[i])
+                      for i in range(max(by_index, default=-1) + 1)]
+            if any(c not in header for c in columns):
+                return header, None
+
+            letters = {}
+            for pos, c in enumerate(columns):
+                i = header.index(c)  # columnas repetidas: pandas deja el nombre a la primera
+                name = ""
+                while i >= 0:
+                    i, r = divmod(i, 26)
+                    name = chr(65 + r) + name
+                    i -= 1
+                letters[name] = pos
+            wanted = re.compile(r'<c r="(' + "|".join(letters) + r')\d+"([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+            checks = [(columns.index(c), frozenset(v)) for c, v in (row_filter or {}).items()]
+
+            out = []
+            n = len(columns)
+            empty = 0
+            for m in rows:
+                num = _ROW_NUM.search(m.group(1))
+                gap = int(num.group(1)) - row_num - 1 if num else 0
+                row_num = int(num.group(1)) if num else row_num + 1
+                inner = m.group(2)
+                if not inner or ("<v>" not in inner and "<is>" not in inner):
+                    empty += gap + 1
+                    continue
+                empty += gap
+                rec = [None] * n
+                for name, attrs, c in wanted.findall(inner):
+                    rec[letters[name]] = cell(attrs, c)
+                if checks:
+                    if all(_key(rec[p]) in allowed for p, allowed in checks):
+                        out.append(rec)  # una fila vacía nunca pasa el filtro
+                    continue
+                # pandas conserva las filas vacías intermedias (no las del final)
+                out.extend([None] * n for _ in range(empty))
+                empty = 0
+                out.append(rec)
+    return header, out
@@ -1,12 +1,14 @@
 # pages/active_Directory.py
 import streamlit as st
-import pandas as pd
 
-from lib.cmdb_utils import normalize_cmdb
-from lib.compare_ad import normalize_ad, compare_cmdb_ad
-from lib.io_utils import read_excel_xlsx, read_csv_smart, download_excel
+from lib.io_utils import format_read_report
+from lib.ingest import TENANTS
+from lib.pipelines import run_ad
+from lib.ui_utils import conflicts_panel, delta_panel, export_panel, file_input, history_button, profiling_panel, result_viewer, snapshot_picker
+from lib.profiling import start_run
 
 st.set_page_config(page_title="CMDB vs Active Directory", layout="wide")
+profile = start_run("ad")  # etapas de este rerun, para el panel de debug
 
 st.title("CMDB vs Active Directory (Pacífico + Prima)")
 st.write("""
@@ -17,68 +19,52 @@ Sube la **CMDB (.xlsx)** (solo se usan equipos *Distribuido(s)*) y los **dos exp
 Se combinarán y se validará por correo.
 """)
 
-cmdb_file = st.file_uploader("CMDB (.xlsx)", type=["xlsx"], key="cmdb_ad")
+cmdb_file = file_input("CMDB (.xlsx)", ["xlsx"], key="cmdb_ad")
+cmdb_snapshot = snapshot_picker("normalize_cmdb", "…o compara contra una CMDB guardada (snapshot)", key="cmdb_snapshot_ad")
 
 st.subheader("Archivos de Active Directory (CSV)")
-col1, col2 = st.columns(2)
-with col1:
-    ad_file_pacifico = st.file_uploader("AD Pacífico (.csv)", type=["csv"], key="ad_pacifico")
-with col2:
-    ad_file_prima = st.file_uploader("AD Prima (.csv)", type=["csv"], key="ad_prima")
-
-if cmdb_file and ad_file_pacifico and ad_file_prima:
+ad_files = {}
+for col, (tenant, label) in zip(st.columns(len(TENANTS)), TENANTS):
+    with col:
+        ad_files[tenant] = file_input(f"AD {label} (.csv)", ["csv"], key=f"ad_{tenant}")
+
+incremental = st.checkbox(
+    "Modo incremental (recalcular solo lo que cambió desde la última corrida)", value=False,
+    key="incremental_ad",
+    help="Compara contra la última corrida guardada: solo se recalculan las claves insertadas, "
+         "modificadas o eliminadas, y se listan las alertas nuevas y resueltas.",
+)
+
+if (cmdb_file or cmdb_snapshot) and all(ad_files.values()):
     try:
-        # --- CMDB ---
-        df_cmdb_raw = read_excel_xlsx(cmdb_file)
-        df_cmdb = normalize_cmdb(df_cmdb_raw)  # ya filtra Distribuido(s)
-
-        if "Correo Electrónico" not in df_cmdb.columns:
-            raise ValueError("La CMDB no tiene la columna 'Correo Electrónico'")
-
-        cmdb_emails = (
-            df_cmdb[["Correo Electrónico"]]
-            .rename(columns={"Correo Electrónico": "email"})
-            .assign(email=lambda s: s["email"].map(lambda x: str(x).strip().lower()))
-            .drop_duplicates()
-        )
-
-        # --- AD: leer, normalizar cada uno y combinar ---
-        ad_pac_raw = read_csv_smart(ad_file_pacifico)
-        ad_pri_raw = read_csv_smart(ad_file_prima)
+        out = run_ad(cmdb_snapshot or cmdb_file, ad_files, incremental)
+        cmdb_emails, ad_all, tenant_std, timings = out["left"], out["right"], out["tenant_std"], out["timings"]
 
-        ad_pac_std = normalize_ad(ad_pac_raw)  # -> email, enabled
-        ad_pri_std = normalize_ad(ad_pri_raw)
-
-        # (opcional) rastro de origen
-        ad_pac_std["origen"] = "pacifico"
-        ad_pri_std["origen"] = "prima"
-
-        ad_all = pd.concat([ad_pac_std, ad_pri_std], ignore_index=True)
-
-        # Deduplicar por email si aparece en ambos (nos quedamos con el primero)
-        ad_all = ad_all.drop_duplicates(subset=["email"], keep="first")
+        with st.expander(f"Tiempos de lectura por archivo (total {timings.attrs['wall_s']:.2f}s)"):
+            st.dataframe(timings, use_container_width=True, hide_index=True)
+            for tenant, label in TENANTS:
+                st.caption(f"AD {label}: {format_read_report(tenant_std[tenant][1])}")
 
         st.subheader("Muestras normalizadas")
         st.write("**CMDB (emails)**", cmdb_emails.head(10))
         st.write("**AD combinado (std)**", ad_all.head(10))
+        conflicts_panel(out["conflicts"], "AD", key="conflicts_ad")
 
         # --- Comparación ---
-        result = compare_cmdb_ad(cmdb_emails, ad_all)
+        result, alerts = out["result"], out["alerts"]
+        if incremental:
+            delta_panel(out)
 
         st.subheader("Resultado de la comparación")
-        st.dataframe(result, use_container_width=True)
+        result_viewer(result, key="ad_result")
 
-        alerts = result[result["Alertas"] != ""].copy()
         st.write(f"**Filas con alertas**: {len(alerts)}")
+        history_button("ad", result, key="history_ad")
         if not alerts.empty:
-            data = download_excel(alerts, "Alertas_AD", "alertas_cmdb_ad_combinado.xlsx")
-            st.download_button(
-                "📥 Descargar Excel de Alertas (AD combinado)",
-                data=data,
-                file_name="alertas_cmdb_ad_combinado.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+            export_panel(alerts, "Alertas_AD", "alertas_cmdb_ad_combinado", "reporte de alertas (AD combinado)", key="export_ad")
     except Exception as e:
         st.error(f"Error procesando archivos: {e}")
 else:
-    st.info("Sube la CMDB y ambos CSV de AD para iniciar la comparación.")
+    st.info("Sube la CMDB y los CSV de AD de cada empresa para iniciar la comparación.")
+
+profiling_panel(profile, key="ad")
@@ -0,0 +1,69 @@
+# pages/conciliacion.py
+import streamlit as st
+
+from lib.io_utils import format_read_report
+from lib.ingest import TENANTS
+from lib.pipelines import run_reconcile
+from lib.ui_utils import conflicts_panel, export_panel, file_input, profiling_panel, result_viewer, snapshot_picker
+from lib.profiling import start_run
+
+st.set_page_config(page_title="CMDB vs Intune vs AD", layout="wide")
+profile = start_run("conciliacion")  # etapas de este rerun, para el panel de debug
+
+st.title("🧩 Conciliación CMDB vs Intune vs Active Directory")
+st.write("""
+Auditoría completa en una sola corrida: la **CMDB (.xlsx)** se lee una vez (solo equipos *Distribuido(s)*)
+y se cruza contra los **reportes de Intune** por **Número de serie** y contra los **exports de AD** por **correo**.
+El resultado es un reporte por equipo: si está en Intune, si su usuario está habilitado en AD y qué no coincide.
+""")
+
+cmdb_file = file_input("CMDB (.xlsx)", ["xlsx"], key="cmdb_conciliacion")
+cmdb_snapshot = snapshot_picker("normalize_cmdb", "…o usa una CMDB guardada (snapshot)", key="cmdb_snapshot_conciliacion")
+
+st.subheader("Archivos de Intune (.csv)")
+intune_files = {}
+for col, (tenant, label) in zip(st.columns(len(TENANTS)), TENANTS):
+    with col:
+        intune_files[tenant] = file_input(f"Intune {label} (.csv)", ["csv"], key=f"conc_intune_{tenant}")
+
+st.subheader("Archivos de Active Directory (.csv)")
+ad_files = {}
+for col, (tenant, label) in zip(st.columns(len(TENANTS)), TENANTS):
+    with col:
+        ad_files[tenant] = file_input(f"AD {label} (.csv)", ["csv"], key=f"conc_ad_{tenant}")
+
+if (cmdb_file or cmdb_snapshot) and all(intune_files.values()) and all(ad_files.values()):
+    try:
+        out = run_reconcile(cmdb_snapshot or cmdb_file, intune_files, ad_files)
+        timings, tenant_std = out["timings"], out["tenant_std"]
+
+        with st.expander(f"Tiempos de lectura por archivo (total {timings.attrs['wall_s']:.2f}s)"):
+            st.dataframe(timings, use_container_width=True, hide_index=True)
+            for tenant, label in TENANTS:
+                st.caption(f"Intune {label}: {format_read_report(tenant_std['intune'][tenant][1])}")
+                st.caption(f"AD {label}: {format_read_report(tenant_std['ad'][tenant][1])}")
+
+        summary = out["summary"]
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Equipos CMDB", summary["equipos"])
+        c2.metric("En Intune", summary["en_intune"])
+        c3.metric("Usuario habilitado en AD", summary["usuario_habilitado"])
+        c4.metric("Con alertas", summary["con_alertas"])
+
+        with st.expander("Conflictos entre tenants"):
+            conflicts_panel(out["conflicts"]["intune"], "Intune", key="conc_conflicts_intune")
+            conflicts_panel(out["conflicts"]["ad"], "AD", key="conc_conflicts_ad")
+
+        report, alerts = out["report"], out["alerts"]
+        st.subheader("Reporte por equipo")
+        result_viewer(report, key="conciliacion_report")
+
+        st.write(f"**Equipos con alertas**: {len(alerts)}")
+        if not alerts.empty:
+            export_panel(alerts, "Conciliacion", "conciliacion_cmdb_intune_ad", "reporte de conciliación", key="export_conciliacion")
+    except Exception as e:
+        st.error(f"Error procesando archivos: {e}")
+else:
+    st.info("Sube la CMDB y los CSV de Intune y AD de cada empresa para iniciar la conciliación.")
+
+profiling_panel(profile, key="conciliacion")
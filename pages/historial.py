@@ -0,0 +1,66 @@
+# pages/historial.py
+from datetime import date, timedelta
+
+import streamlit as st
+
+from lib.alert_history import HISTORY_ENABLED, HISTORY_KINDS, alert_trend, key_history, list_runs
+from lib.ui_utils import profiling_panel
+from lib.profiling import start_run
+
+st.set_page_config(page_title="Historial de alertas", layout="wide")
+profile = start_run("historial")  # etapas de este rerun, para el panel de debug
+
+KIND_LABELS = {"qa": "QA de inventario", "intune": "CMDB vs Intune", "ad": "CMDB vs Active Directory"}
+
+st.title("📈 Historial de alertas")
+st.write("""
+Las corridas de **QA**, **CMDB vs Intune** y **CMDB vs AD** se guardan en un historial local: todas las de `cli.py`
+y, en la app, las que se guardan con el botón **Guardar en historial**.
+Aquí se ve cómo cambia el número de filas por alerta entre corridas y la historia de un equipo o cuenta.
+""")
+if not HISTORY_ENABLED:
+    st.warning("El historial está deshabilitado (CMDB_HISTORY=0): no se guardan corridas nuevas.")
+
+c1, c2, c3 = st.columns([2, 1, 1])
+kind = c1.selectbox("Corrida", list(HISTORY_KINDS), format_func=KIND_LABELS.get, key="history_kind")
+since = c2.date_input("Desde", value=date.today() - timedelta(days=90), key="history_since")
+until = c3.date_input("Hasta", value=date.today(), key="history_until")
+since, until = since.isoformat(), until.isoformat()
+
+runs = list_runs(kind, since, until)
+if runs.empty:
+    st.info("No hay corridas guardadas en ese rango.")
+else:
+    daily = st.checkbox(
+        "Una corrida por día (la última)", value=True, key="history_daily",
+        help="Si en un día se guardó más de una corrida, la tendencia usa solo la última.",
+    )
+    trend = alert_trend(kind, since, until)
+    if daily:
+        trend = trend.groupby(trend.index.normalize()).tail(1)
+        trend.index = trend.index.normalize()
+
+    st.subheader("Tendencia por alerta")
+    alerts = st.multiselect("Alertas", list(trend.columns), default=list(trend.columns), key="history_alerts")
+    if alerts:
+        st.line_chart(trend[alerts])
+    last = trend.iloc[-1]
+    prev = trend.iloc[-2] if len(trend) > 1 else None
+    cols = st.columns(min(len(alerts), 4) or 1)
+    for i, alert in enumerate(alerts):
+        delta = None if prev is None else int(last[alert] - prev[alert])
+        cols[i % len(cols)].metric(alert, int(last[alert]), delta, delta_color="inverse")
+
+    with st.expander(f"Corridas guardadas ({len(runs)})"):
+        st.dataframe(runs, use_container_width=True, hide_index=True)
+
+    st.subheader("Historia de un equipo / cuenta")
+    key_col, _ = HISTORY_KINDS[kind]
+    key = st.text_input(f"{key_col} exacto", key="history_key").strip()
+    if key:
+        history = key_history(kind, key.lower() if kind == "ad" else key, since, until)
+        if (history["Alertas"] == "").all():
+            st.success(f"{key_col} {key!r} no tuvo alertas en las corridas del rango.")
+        st.dataframe(history, use_container_width=True, hide_index=True)
+
+profiling_panel(profile, key="historial")
@@ -1,12 +1,14 @@
 # pages/intune.py
 import streamlit as st
-import pandas as pd
 
-from lib.cmdb_utils import normalize_cmdb, cmdb_std_cols
-from lib.compare_intune import normalize_intune, compare_cmdb_intune
-from lib.io_utils import read_excel_xlsx, read_csv_smart, download_excel
+from lib.io_utils import format_read_report
+from lib.ingest import TENANTS
+from lib.pipelines import run_intune
+from lib.ui_utils import conflicts_panel, delta_panel, export_panel, file_input, history_button, profiling_panel, result_viewer, snapshot_picker
+from lib.profiling import start_run
 
 st.set_page_config(page_title="CMDB vs Intune", layout="wide")
+profile = start_run("intune")  # etapas de este rerun, para el panel de debug
 
 st.title("🔄 CMDB vs Intune (Pacífico + Prima)")
 st.write("""
@@ -17,59 +19,68 @@ Sube la **CMDB (.xlsx)** y los **dos reportes de Intune (.csv)**:
 Se combinarán y se compararán contra CMDB por **Número de serie**.
 """)
 
-cmdb_file = st.file_uploader("CMDB (.xlsx)", type=["xlsx"], key="cmdb_intune")
+cmdb_file = file_input("CMDB (.xlsx)", ["xlsx"], key="cmdb_intune")
+cmdb_snapshot = snapshot_picker("normalize_cmdb", "…o compara contra una CMDB guardada (snapshot)", key="cmdb_snapshot_intune")
 
 st.subheader("Archivos de Intune (.csv)")
-col1, col2 = st.columns(2)
-with col1:
-    intune_file_pacifico = st.file_uploader("Intune Pacífico (.csv)", type=["csv"], key="intune_pacifico")
-with col2:
-    intune_file_prima = st.file_uploader("Intune Prima (.csv)", type=["csv"], key="intune_prima")
-
-if cmdb_file and intune_file_pacifico and intune_file_prima:
+intune_files = {}
+for col, (tenant, label) in zip(st.columns(len(TENANTS)), TENANTS):
+    with col:
+        intune_files[tenant] = file_input(f"Intune {label} (.csv)", ["csv"], key=f"intune_{tenant}")
+
+incremental = st.checkbox(
+    "Modo incremental (recalcular solo lo que cambió desde la última corrida)", value=False,
+    key="incremental_intune",
+    help="Compara contra la última corrida guardada: solo se recalculan las claves insertadas, "
+         "modificadas o eliminadas, y se listan las alertas nuevas y resueltas.",
+)
+
+if (cmdb_file or cmdb_snapshot) and all(intune_files.values()):
     try:
-        # --- CMDB ---
-        df_cmdb_raw = read_excel_xlsx(cmdb_file)
-        df_cmdb = normalize_cmdb(df_cmdb_raw)        # filtra Distribuido(s) y normaliza
-        df_cmdb_std = cmdb_std_cols(df_cmdb)         # -> serial, email, hostname
-
-        # --- INTUNE: leer, normalizar cada uno y combinar ---
-        pac_raw = read_csv_smart(intune_file_pacifico)
-        pri_raw = read_csv_smart(intune_file_prima)
-
-        pac_std = normalize_intune(pac_raw)          # -> serial, email, hostname
-        pri_std = normalize_intune(pri_raw)
+        out = run_intune(cmdb_snapshot or cmdb_file, intune_files, incremental)
+        df_cmdb_std, intune_all, tenant_std, timings = out["left"], out["right"], out["tenant_std"], out["timings"]
 
-        # (opcional) dejar rastro de origen
-        pac_std["origen"] = "pacifico"
-        pri_std["origen"] = "prima"
-
-        intune_all = pd.concat([pac_std, pri_std], ignore_index=True)
-
-        # Deduplicar por serial si aparece en ambas consolas (nos quedamos con el primero)
-        intune_all = intune_all.drop_duplicates(subset=["serial"], keep="first")
+        with st.expander(f"Tiempos de lectura por archivo (total {timings.attrs['wall_s']:.2f}s)"):
+            st.dataframe(timings, use_container_width=True, hide_index=True)
+            for tenant, label in TENANTS:
+                st.caption(f"Intune {label}: {format_read_report(tenant_std[tenant][1])}")
 
         st.subheader("Muestras normalizadas")
         st.write("**CMDB (std)**", df_cmdb_std.head(10))
         st.write("**Intune combinado (std)**", intune_all.head(10))
+        conflicts_panel(out["conflicts"], "Intune", key="conflicts_intune")
 
         # --- Comparación ---
-        result = compare_cmdb_intune(df_cmdb_std, intune_all)
+        result, alerts = out["result"], out["alerts"]
+        if incremental:
+            delta_panel(out)
 
         st.subheader("Resultado de la comparación")
-        st.dataframe(result, use_container_width=True)
+        result_viewer(result, key="intune_result")
 
-        alerts = result[result["Alertas"] != ""].copy()
         st.write(f"**Filas con alertas**: {len(alerts)}")
+        history_button("intune", result, key="history_intune")
         if not alerts.empty:
-            data = download_excel(alerts, "Alertas_Intune", "alertas_cmdb_intune_combinado.xlsx")
-            st.download_button(
-                "📥 Descargar Excel de Alertas (Intune combinado)",
-                data=data,
-                file_name="alertas_cmdb_intune_combinado.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            export_panel(alerts, "Alertas_Intune", "alertas_cmdb_intune_combinado", "reporte de alertas (Intune combinado)", key="export_intune")
+
+        # --- Posibles coincidencias para "Serie no existe en Intune" ---
+        matches = out["matches"]
+        if not matches.empty:
+            st.subheader("🔎 Posibles coincidencias de serie")
+            n_missing = int((result["Alertas"] == "Serie no existe en Intune").sum())
+            st.caption(
+                f"{len(matches)} de {n_missing} series sin match exacto tienen una candidata en Intune: "
+                "misma serie canónica (sin S/N, guiones, espacios ni ceros a la izquierda, sin distinguir "
+                "mayúsculas), a 1 edición de distancia o mismo hostname. `candidatos` > 1: revisar a mano."
             )
+            counts = matches["criterio"].value_counts(sort=False)
+            for col, (criterio, n) in zip(st.columns(len(counts)), counts.items()):
+                col.metric(criterio, int(n))
+            st.dataframe(matches, use_container_width=True, hide_index=True)
+            export_panel(matches, "Propuestas", "propuestas_serie_intune", "propuestas de match", key="export_matches_intune")
     except Exception as e:
         st.error(f"Error procesando archivos: {e}")
 else:
-    st.info("Sube la CMDB y ambos CSV de Intune para iniciar la comparación.")
+    st.info("Sube la CMDB y los CSV de Intune de cada empresa para iniciar la comparación.")
+
+profiling_panel(profile, key="intune")